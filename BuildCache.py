@@ -0,0 +1,98 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import functools
+import glob
+import hashlib
+import os
+import tempfile
+import typing
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_fingerprint() -> str:
+    """Hashes the source of every compiler module, so that any change to the
+    compiler itself acts as a new compiler version and invalidates the cache.
+
+    Returns:
+        str: a hex digest identifying this version of the compiler.
+    """
+    digest = hashlib.sha256()
+    compiler_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(compiler_dir, "*.py"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as module_file:
+            digest.update(module_file.read())
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """A persistent, content-addressed store of compiled .vm output. Every
+    entry is a file named after the hash of the compiler version, the
+    compilation options and the Jack source, so unchanged classes can be
+    restored without tokenizing or parsing them again.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Opens (and creates if needed) the cache in the given directory.
+
+        Args:
+            directory (str): where cache entries are stored.
+        """
+        self.directory = directory
+        self.fingerprint = compiler_fingerprint()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source: bytes, options: str = "") -> str:
+        """
+        Args:
+            source (bytes): the contents of a .jack file.
+            options (str): anything else that changes the emitted code.
+
+        Returns:
+            str: the cache key of that source.
+        """
+        digest = hashlib.sha256(self.fingerprint.encode())
+        digest.update(options.encode())
+        digest.update(b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> typing.Optional[str]:
+        """
+        Args:
+            key (str): a key returned by key().
+
+        Returns:
+            typing.Optional[str]: the cached VM code, or None on a miss.
+        """
+        try:
+            with open(self._entry_path(key), "r") as entry:
+                return entry.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, vm_code: str) -> None:
+        """Stores VM code under a key. The entry is written to a temporary
+        file and renamed into place, so concurrent builds never see a
+        partially written entry.
+
+        Args:
+            key (str): a key returned by key().
+            vm_code (str): the compiled VM code.
+        """
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as entry:
+                entry.write(vm_code)
+            os.replace(temp_path, self._entry_path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".vm")
@@ -0,0 +1,116 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import typing
+from ClassIndex import OS_API
+from VMCode import ARG1_MASK, ARG1_SHIFT, CALL, FUNCTION, OPCODE_SHIFT, VMCode
+
+# Where a program starts running: the VM bootstrap calls Sys.init, which
+# calls Main.main.
+ENTRY_POINTS = ("Main.main", "Sys.init")
+
+
+def subroutines(code: VMCode) -> typing.Iterator[typing.Tuple[str, int, int]]:
+    """Splits the code of a class into its subroutines.
+
+    Args:
+        code (VMCode): the code of one class.
+
+    Yields:
+        typing.Tuple[str, int, int]: the name of every subroutine, with the
+        index of its function command and the index after its last command.
+    """
+    words = code.words
+    starts = [index for index, word in enumerate(words)
+              if word >> OPCODE_SHIFT == FUNCTION]
+    for position, start in enumerate(starts):
+        end = starts[position + 1] if position + 1 < len(starts) else len(words)
+        yield code.names[words[start] >> ARG1_SHIFT & ARG1_MASK], start, end
+
+
+def call_graph(codes: typing.Iterable[VMCode]
+               ) -> typing.Dict[str, typing.Set[str]]:
+    """
+    Args:
+        codes (typing.Iterable[VMCode]): the code of every class of a program.
+
+    Returns:
+        typing.Dict[str, typing.Set[str]]: every subroutine defined in the
+        program, mapped to the names of the subroutines it calls.
+    """
+    graph: typing.Dict[str, typing.Set[str]] = {}
+    for code in codes:
+        names = code.names
+        words = code.words
+        for name, start, end in subroutines(code):
+            graph[name] = {names[word >> ARG1_SHIFT & ARG1_MASK]
+                           for word in words[start:end]
+                           if word >> OPCODE_SHIFT == CALL}
+    return graph
+
+
+def roots(graph: typing.Dict[str, typing.Set[str]]) -> typing.Set[str]:
+    """
+    Args:
+        graph (typing.Dict[str, typing.Set[str]]): a program's call graph.
+
+    Returns:
+        typing.Set[str]: the subroutines that must be kept no matter what
+        calls them: the entry points, and every OS API subroutine that the
+        program implements itself, since the rest of the OS may call it.
+    """
+    kept = set(ENTRY_POINTS)
+    for class_name, api in OS_API.items():
+        kept.update(f"{class_name}.{subroutine}" for subroutine in api)
+    return kept & graph.keys()
+
+
+def reachable(graph: typing.Dict[str, typing.Set[str]],
+              start: typing.Iterable[str]) -> typing.Set[str]:
+    """
+    Args:
+        graph (typing.Dict[str, typing.Set[str]]): a program's call graph.
+        start (typing.Iterable[str]): the subroutines known to run.
+
+    Returns:
+        typing.Set[str]: every subroutine of the program that can run.
+    """
+    seen = set()
+    pending = [name for name in start if name in graph]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        pending.extend(callee for callee in graph[name]
+                       if callee in graph and callee not in seen)
+    return seen
+
+
+def remove_subroutines(code: VMCode, keep: typing.Set[str]
+                       ) -> typing.List[typing.Tuple[str, int]]:
+    """Removes every subroutine that is not in keep, in place.
+
+    Args:
+        code (VMCode): the code of one class.
+        keep (typing.Set[str]): the names of the subroutines to keep.
+
+    Returns:
+        typing.List[typing.Tuple[str, int]]: the name and the number of
+        commands of every removed subroutine.
+    """
+    removed = []
+    kept_words = array.array(code.words.typecode)
+    for name, start, end in subroutines(code):
+        if name in keep:
+            kept_words.extend(code.words[start:end])
+        else:
+            removed.append((name, end - start))
+    if removed:
+        code.words[:] = kept_words
+    return removed
@@ -0,0 +1,145 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import hashlib
+import re
+import typing
+
+
+class Signature(typing.NamedTuple):
+    """What a call needs to know about a subroutine."""
+    # "constructor", "function" or "method".
+    kind: str
+    # The number of declared parameters, not counting a method's "this".
+    arity: int
+
+
+def _api(**subroutines: typing.Tuple[str, int]) -> typing.Dict[str, Signature]:
+    return {name: Signature(*signature) for name, signature in subroutines.items()}
+
+
+_F, _M, _C = "function", "method", "constructor"
+
+# The Jack OS API, as specified in the nand2tetris book.
+OS_API: typing.Dict[str, typing.Dict[str, Signature]] = {
+    "Math": _api(init=(_F, 0), abs=(_F, 1), multiply=(_F, 2), divide=(_F, 2),
+                 min=(_F, 2), max=(_F, 2), sqrt=(_F, 1)),
+    "String": _api(new=(_C, 1), dispose=(_M, 0), length=(_M, 0),
+                   charAt=(_M, 1), setCharAt=(_M, 2), appendChar=(_M, 1),
+                   eraseLastChar=(_M, 0), intValue=(_M, 0), setInt=(_M, 1),
+                   backSpace=(_F, 0), doubleQuote=(_F, 0), newLine=(_F, 0)),
+    "Array": _api(new=(_F, 1), dispose=(_M, 0)),
+    "Output": _api(init=(_F, 0), moveCursor=(_F, 2), printChar=(_F, 1),
+                   printString=(_F, 1), printInt=(_F, 1), println=(_F, 0),
+                   backSpace=(_F, 0)),
+    "Screen": _api(init=(_F, 0), clearScreen=(_F, 0), setColor=(_F, 1),
+                   drawPixel=(_F, 2), drawLine=(_F, 4), drawRectangle=(_F, 4),
+                   drawCircle=(_F, 3)),
+    "Keyboard": _api(init=(_F, 0), keyPressed=(_F, 0), readChar=(_F, 0),
+                     readLine=(_F, 1), readInt=(_F, 1)),
+    "Memory": _api(init=(_F, 0), peek=(_F, 1), poke=(_F, 2), alloc=(_F, 1),
+                   deAlloc=(_F, 1)),
+    "Sys": _api(init=(_F, 0), halt=(_F, 0), error=(_F, 1), wait=(_F, 1)),
+}
+
+# Finds class and subroutine declarations without parsing bodies, in two
+# passes that run entirely inside the regex engine: comments and strings are
+# blanked out first, and then keywords, which cannot be identifiers, only
+# ever start declarations.
+_COMMENT_OR_STRING_PATTERN = re.compile(rb'//[^\n]*|/\*.*?\*/|"[^"\n]*"',
+                                        re.DOTALL)
+_DECLARATION_PATTERN = re.compile(rb"""
+      \bclass \s+ (\w+)
+    | \b(constructor|function|method) \s+ \w+ \s+ (\w+) \s* \( ([^)]*) \)
+""", re.VERBOSE)
+
+
+class ClassIndex:
+    """The subroutine signatures of every class of a program, together with
+    the OS API, for whole-program checks and passes. Lookups are two dict
+    lookups. Classes of the program replace OS classes of the same name, so
+    programs that bring their own OS are indexed correctly.
+    """
+
+    def __init__(self, include_os: bool = True) -> None:
+        """
+        Args:
+            include_os (bool): whether to start with the OS API.
+        """
+        self.classes: typing.Dict[str, typing.Dict[str, Signature]] = \
+            dict(OS_API) if include_os else {}
+        self._fingerprint: typing.Optional[str] = None
+
+    @classmethod
+    def scan(cls, paths: typing.Iterable[str]) -> "ClassIndex":
+        """Builds the index of a program with a signature-only pre-scan.
+
+        Args:
+            paths (typing.Iterable[str]): the program's .jack files.
+
+        Returns:
+            ClassIndex: the index of those classes and of the OS.
+        """
+        index = cls()
+        for path in paths:
+            with open(path, 'rb') as source_file:
+                index.add_source(source_file.read())
+        return index
+
+    def add_source(self, source: bytes) -> None:
+        """Indexes the declarations of one .jack file.
+
+        Args:
+            source (bytes): the source code of the file.
+        """
+        self._fingerprint = None
+        subroutines: typing.Dict[str, Signature] = {}
+        code = _COMMENT_OR_STRING_PATTERN.sub(b" ", source)
+        for class_name, kind, name, parameters in \
+                _DECLARATION_PATTERN.findall(code):
+            if class_name:
+                subroutines = self.classes[class_name.decode()] = {}
+            else:
+                arity = parameters.count(b",") + 1 if parameters.strip() else 0
+                subroutines[name.decode()] = Signature(kind.decode(), arity)
+
+    def lookup(self, class_name: str,
+               subroutine: str) -> typing.Optional[Signature]:
+        """
+        Args:
+            class_name (str): a class name.
+            subroutine (str): a subroutine name.
+
+        Returns:
+            typing.Optional[Signature]: the subroutine's signature, or None if
+            the class or the subroutine is not known.
+        """
+        subroutines = self.classes.get(class_name)
+        return None if subroutines is None else subroutines.get(subroutine)
+
+    def has_class(self, class_name: str) -> bool:
+        """
+        Args:
+            class_name (str): a class name.
+
+        Returns:
+            bool: whether the class is part of the program or of the OS.
+        """
+        return class_name in self.classes
+
+    def fingerprint(self) -> str:
+        """
+        Returns:
+            str: a digest of every signature, which changes whenever a call
+            check could give a different answer.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.blake2b(repr(sorted(
+                (class_name, sorted(subroutines.items()))
+                for class_name, subroutines in self.classes.items()
+            )).encode(), digest_size=16).hexdigest()
+        return self._fingerprint
@@ -5,32 +5,166 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import functools
 import typing
+from ClassIndex import ClassIndex
+from CompileProfiler import CompileHooks, instrument
+from JackLexer import TokenKind
 from JackTokenizer import JackTokenizer
-from SymbolTable import SymbolTable
+from SymbolTable import Symbol, SymbolTable
+from VMCode import ARITHMETIC_NAMES, PUSH
+from VMInliner import inlinable_bodies, inline_calls
+from VMOptimizer import constant_code, optimize_code, to_int16
 from VMWriter import VMWriter
+
+
+def _divide(x: int, y: int) -> typing.Optional[int]:
+    # Math.divide truncates towards zero; division by zero is left to it.
+    if y == 0:
+        return None
+    quotient = abs(x) // abs(y)
+    return -quotient if (x < 0) != (y < 0) else quotient
+
+
+# Jack operators evaluated on constant operands when optimizing. Results are
+# wrapped to 16 bits by the caller. A Hack shiftright may or may not keep the
+# sign bit, so "#" is only evaluated on non-negative values.
+_CONSTANT_OPS: typing.Dict[str, typing.Callable[[int, int], typing.Optional[int]]] = {
+    "+": lambda x, y: x + y,
+    "-": lambda x, y: x - y,
+    "*": lambda x, y: x * y,
+    "/": _divide,
+    "&": lambda x, y: x & y,
+    "|": lambda x, y: x | y,
+    "<": lambda x, y: -1 if x < y else 0,
+    ">": lambda x, y: -1 if x > y else 0,
+    "=": lambda x, y: -1 if x == y else 0,
+}
+_CONSTANT_UNARY_OPS: typing.Dict[str, typing.Callable[[int], typing.Optional[int]]] = {
+    "-": lambda x: -x,
+    "~": lambda x: ~x,
+    "^": lambda x: x << 1,
+    "#": lambda x: x >> 1 if x >= 0 else None,
+}
+
+
+# Binary and unary operators, by symbol, with the VM arithmetic command or
+# OS function that applies them.
+_BINARY_ARITHMETIC = {"+": "add", "-": "sub", "&": "and", "|": "or",
+                      "<": "lt", ">": "gt", "=": "eq"}
+_BINARY_CALLS = {"*": "Math.multiply", "/": "Math.divide"}
+_UNARY_ARITHMETIC = {"-": "neg", "~": "not", "^": "shiftleft",
+                     "#": "shiftright"}
+
+# Binding strength of the binary operators. Jack has no precedence: every
+# operator binds equally and expressions evaluate left to right. The
+# conventional order, binding tightest first, is * /, + -, < >, =, & and |.
+_JACK_PRECEDENCE = dict.fromkeys("+-*/&|<>=", 0)
+_CONVENTIONAL_PRECEDENCE = {"*": 5, "/": 5, "+": 4, "-": 4, "<": 3, ">": 3,
+                            "=": 2, "&": 1, "|": 0}
+
+# Kinds of the entries on the pending stack of the expression parser. The
+# bottom entry stands for the end of the expression.
+_BINARY, _UNARY, _GROUP, _INDEX, _CALL, _BOTTOM = range(6)
+
+# The largest integer constant the Jack language allows.
+_MAX_INT_CONST = 32767
+
+_KEYWORD_CONSTANTS = frozenset(["true", "false", "null", "this"])
+_SUBROUTINE_KINDS = frozenset(["constructor", "function", "method"])
+_CALL_SYMBOLS = frozenset(["(", "."])
+
+
+class _Call:
+    """A subroutine call whose arguments are being compiled."""
+    __slots__ = ("class_name", "subroutine", "arg_num", "line", "on_object")
+
+    def __init__(self, class_name: str, subroutine: str, arg_num: int,
+                 line: int) -> None:
+        self.class_name = class_name
+        self.subroutine = subroutine
+        # Counts the arguments pushed so far, including the object.
+        self.arg_num = arg_num
+        self.line = line
+        self.on_object = arg_num == 1
+
+
 class CompilationEngine:
     """
     Gets input from a JackTokenizer and emits its parsed structure into an
     output stream.
     """
-    # Static counters shared across all instances/files
-    _if_else_counter = 0
-    _while_counter = 0
-
-    def __init__(self, input_stream: JackTokenizer, output_stream) -> None:
+    def __init__(self, input_stream: JackTokenizer, output_stream,
+                 optimize: bool = False, pool_strings: bool = False,
+                 class_index: typing.Optional[ClassIndex] = None,
+                 inline_budget: int = 0,
+                 hooks: typing.Optional[CompileHooks] = None,
+                 precedence: bool = False) -> None:
         """
         Creates a new compilation engine with the given input and output. The
         next routine called must be compileClass()
         :param input_stream: The input stream.
         :param output_stream: The output stream.
+        :param optimize: Whether to fold constant expressions while parsing
+            and run the peephole optimizer over the code of the class before
+            it is written.
+        :param pool_strings: Whether every distinct string literal is built
+            once, on its first evaluation, and reused afterwards. Only safe
+            for programs that never modify or dispose of literal strings.
+        :param class_index: The signatures of the whole program. If given,
+            every call must name an existing subroutine of the right kind
+            with the right number of arguments.
+        :param inline_budget: If positive, calls to subroutines of this class
+            with bodies of at most this many VM commands are inlined, see
+            VMInliner.inlinable_bodies. The inlined call sites are kept in
+            self.inlined_calls.
+        :param hooks: Callbacks to run around the compilation phases, see
+            CompileProfiler.PHASES.
+        :param precedence: Whether binary operators follow the conventional
+            precedence instead of Jack's left to right evaluation, so that
+            1 + 2 * 3 is 7 rather than 9. Parenthesized code means the same
+            either way.
         """
         self.input_stream = input_stream
         self.output_stream = output_stream
+        self.optimize = optimize
+        self.pool_strings = pool_strings
+        self.class_index = class_index
+        self.inline_budget = inline_budget
+        self.precedence = precedence
+        self.inlined_calls: typing.List[typing.Tuple[str, str]] = []
         self.current_type_processed = ""
         self.vm_writer = VMWriter(output_stream)
         self.symbol_table = SymbolTable()
         self.class_name = ""
+        # Labels are numbered per subroutine and prefixed with its full name,
+        # as in Main.main$IF_TRUE_0, so the code of a subroutine depends on
+        # its own source only: not on what ran in the process before it, nor
+        # on the subroutines before it in the class.
+        self._label_prefix = ""
+        self._if_else_counter = 0
+        self._while_counter = 0
+        # Pooled string literals, mapped to their index in the pool.
+        self._pooled_strings: typing.Dict[str, int] = {}
+        # Dispatch tables from token values to the bound handlers that
+        # compile or emit them, so that every token is looked up once.
+        self._statements = {"let": self.compile_let, "if": self.compile_if,
+                            "while": self.compile_while, "do": self.compile_do,
+                            "return": self.compile_return}
+        arithmetic_writer = self.vm_writer.arithmetic_writer
+        self._binary_ops: typing.Dict[str, typing.Callable[[], None]] = {
+            op: arithmetic_writer(command)
+            for op, command in _BINARY_ARITHMETIC.items()}
+        self._binary_ops.update(
+            (op, functools.partial(self.vm_writer.write_call, function, 2))
+            for op, function in _BINARY_CALLS.items())
+        self._unary_ops: typing.Dict[str, typing.Callable[[], None]] = {
+            op: arithmetic_writer(command)
+            for op, command in _UNARY_ARITHMETIC.items()}
+        self._precedence = _CONVENTIONAL_PRECEDENCE if precedence \
+            else _JACK_PRECEDENCE
+        if hooks is not None:
+            instrument(self, hooks)
         self.compile_class()
 
     def compile_class(self) -> None:
@@ -44,8 +178,25 @@ class CompilationEngine:
         # if self.input_stream.token_type() == "KEYWORD" and self.input_stream.keyword() in ["static", "field"]:
         self.compile_class_var_dec()
         self.compile_subroutine()
-        #self.input_stream.advance() #TODO check if needed
-        self.input_stream.advance() # }
+        # The current token is the closing }, the last one of the input.
+        self._write_string_pool()
+        if self.inline_budget > 0:
+            code = self.vm_writer.code
+            self.inlined_calls = inline_calls(
+                code, inlinable_bodies(code, self.inline_budget))
+        if self.optimize:
+            optimize_code(self.vm_writer.code)
+        self.vm_writer.flush()
+
+    def _current_keyword(self) -> str:
+        """Returns the current token if it is a keyword, and "" otherwise."""
+        token = self.input_stream.current
+        return token.value if token.kind is TokenKind.KEYWORD else ""
+
+    def _at_symbol(self, symbol: str) -> bool:
+        """Checks whether the current token is the given symbol."""
+        token = self.input_stream.current
+        return token.kind is TokenKind.SYMBOL and token.value == symbol
 
     def compile_class_var_dec(self) -> None:
         """Compiles a static declaration or a field declaration."""
@@ -55,7 +206,7 @@ class CompilationEngine:
     def compile_all_vars_in_dec(self, is_class_var_dec: bool) -> int:
         type_of_var = "classVarDec" if is_class_var_dec else "varDec"
         lst_to_be_in = ["static", "field"] if is_class_var_dec else ['var']
-        while self.input_stream.token_type() == "KEYWORD" and self.input_stream.keyword() in lst_to_be_in:
+        while self._current_keyword() in lst_to_be_in:
             kind_of_var = self.input_stream.keyword()
             self.input_stream.advance()
             type_of_var = self.input_stream.identifier()
@@ -63,7 +214,7 @@ class CompilationEngine:
             var_name = self.input_stream.identifier()
             self.symbol_table.define(var_name, type_of_var, kind_of_var.upper())
             self.input_stream.advance()
-            while self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() == ",":
+            while self._at_symbol(","):
                 self.input_stream.advance()
                 var_name = self.input_stream.identifier()
                 self.symbol_table.define(var_name, type_of_var, kind_of_var.upper())
@@ -74,50 +225,59 @@ class CompilationEngine:
     # VX
     def compile_subroutine(self) -> None:
         """
-        Compiles a complete method, function, or constructor.
+        Compiles every method, function, or constructor of the class.
         You can assume that classes with constructors have at least one field,
         you will understand why this is necessary in project 11.
         """
-        while self.input_stream.token_type() == "KEYWORD" and self.input_stream.keyword() in ["constructor", "function", "method"]:
-            function_type = self.input_stream.keyword()
-            self.symbol_table.start_subroutine()
-            if function_type == "method":
-                self.symbol_table.define("this", self.class_name, "ARG")
-            self.input_stream.advance() # function kind -> function type (current)
-            function_type_is_void = self.input_stream.identifier() == "void" # only care about void because other types are not important for the vm code, and void functions push constant 0 at the end
-            self.input_stream.advance() # function type -> function name (current)
-            function_name = self.input_stream.identifier()
-            function_name_full = f"{self.class_name}.{function_name}"
-            self.input_stream.advance() # function name -> (
-            self.input_stream.advance() # ( -> type of first parameter or ) 
-            arg_count = self.compile_parameter_list()
-            self.input_stream.advance() # { -> var dec or statements
-            local_count = self.compile_var_dec()
-            self.vm_writer.write_function(function_name_full, local_count)
-            if function_type == "method":
-                self.vm_writer.write_push("argument", 0)
-                self.vm_writer.write_pop("pointer", 0)
-            # self.output_stream.advance()
-            if function_type == "constructor":
-                self.vm_writer.write_push("constant", self.symbol_table.var_count("FIELD"))
-                self.vm_writer.write_call("Memory.alloc", 1)
-                self.vm_writer.write_pop("pointer", 0)
-            self.compile_statements()
-            # if function_type_is_void:
-            #     self.vm_writer.write_push("constant", 0)
-            self.input_stream.advance() #
+        while self._current_keyword() in _SUBROUTINE_KINDS:
+            self.compile_subroutine_dec()
+
+    def compile_subroutine_dec(self) -> None:
+        """Compiles one method, function, or constructor, starting at its
+        kind keyword.
+        """
+        function_type = self.input_stream.keyword()
+        self.symbol_table.start_subroutine()
+        if function_type == "method":
+            self.symbol_table.define("this", self.class_name, "ARG")
+        self.input_stream.advance() # function kind -> function type (current)
+        function_type_is_void = self.input_stream.identifier() == "void" # only care about void because other types are not important for the vm code, and void functions push constant 0 at the end
+        self.input_stream.advance() # function type -> function name (current)
+        function_name = self.input_stream.identifier()
+        function_name_full = f"{self.class_name}.{function_name}"
+        self._label_prefix = f"{function_name_full}$"
+        self._if_else_counter = 0
+        self._while_counter = 0
+        self.input_stream.advance() # function name -> (
+        self.input_stream.advance() # ( -> type of first parameter or ) 
+        arg_count = self.compile_parameter_list()
+        self.input_stream.advance() # { -> var dec or statements
+        local_count = self.compile_var_dec()
+        self.vm_writer.write_function(function_name_full, local_count)
+        if function_type == "method":
+            self.vm_writer.write_push("argument", 0)
+            self.vm_writer.write_pop("pointer", 0)
+        # self.output_stream.advance()
+        if function_type == "constructor":
+            self.vm_writer.write_push("constant", self.symbol_table.var_count("FIELD"))
+            self.vm_writer.write_call("Memory.alloc", 1)
+            self.vm_writer.write_pop("pointer", 0)
+        self.compile_statements()
+        # if function_type_is_void:
+        #     self.vm_writer.write_push("constant", 0)
+        self.input_stream.advance() #
 
     def compile_parameter_list(self) -> None:
         """Compiles a (possibly empty) parameter list, not including the 
         enclosing "()".
         """
-        while not self.input_stream.token_type == "SYMBOL" and self.input_stream.symbol() != ')':
+        while not self._at_symbol(")"):
             type_of_var = self.input_stream.identifier()
             self.input_stream.advance() # type -> var name
             var_name = self.input_stream.identifier()
             self.symbol_table.define(var_name, type_of_var, "ARG")
             self.input_stream.advance() #var name -> , or )
-            if self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() == ",":
+            if self._at_symbol(","):
                 self.input_stream.advance()
         self.input_stream.advance() # ) -> {
         return self.symbol_table.var_count("ARG")
@@ -130,19 +290,11 @@ class CompilationEngine:
         """Compiles a sequence of statements, not including the enclosing 
         "{}".
         """
-        while self.input_stream.token_type() == "KEYWORD" and self.input_stream.keyword() in ["let", "if", "while", "do", "return"]:
-            if self.input_stream.keyword() == "let":
-                self.compile_let()
-            elif self.input_stream.keyword() == "if":
-                self.compile_if()
-            elif self.input_stream.keyword() == "while":
-                self.compile_while()
-            elif self.input_stream.keyword() == "do":
-                self.compile_do()
-            elif self.input_stream.keyword() == "return":
-                self.compile_return()
-            # TODO: check if advanced is need here.
-            # self.input_stream.advance()
+        statements = self._statements
+        token = self.input_stream.current
+        while token.kind is TokenKind.KEYWORD and token.value in statements:
+            statements[token.value]()
+            token = self.input_stream.current
 
     def compile_do(self) -> None:
         """Compiles a do statement."""
@@ -159,40 +311,91 @@ class CompilationEngine:
         if first_token == "":
             first_token = self.input_stream.identifier()
             self.input_stream.advance()
+        call = self._start_subroutine_call(first_token)
+        call.arg_num += self.compile_expression_list()
+        self._finish_subroutine_call(call)
+
+    def _start_subroutine_call(self, first_token: str) -> _Call:
+        """Compiles a subroutine call up to its arguments: starts at the ( or
+        . after first_token, pushes the object of a method call, and returns
+        at the first token after the (.
+        """
         # self.output_stream.write(f"<identifier> {first_token} </identifier>\n") #className | subroutineName
         # self.output_stream.write(f"<symbol> {self.input_stream.symbol()} </symbol>\n")
         second_token = ""
-        if self.input_stream.symbol() == ".":
+        if self._at_symbol("."):
             self.input_stream.advance() # . to subroutineName
             second_token = self.input_stream.identifier()
             self.input_stream.advance() # subroutineName to (
+        line = self.input_stream.current.line
         self.input_stream.advance()
-        arg_num = 0
-        class_of_var = ""
         if second_token != "":
-            if self.symbol_table.is_var(first_token): #variable.method call
-                self.push_variable(first_token)
-                arg_num += 1
-                class_of_var = f"{self.symbol_table.type_of(first_token)}."
-            else:
-                class_of_var = f"{first_token}." #some class.function call
-        else: #method call
-            second_token = first_token
-            self.vm_writer.write_push("pointer", 0)
-            arg_num += 1
-            class_of_var = f"{self.class_name}."
-        arg_num += self.compile_expression_list()
-        function_call = class_of_var + second_token
-        self.vm_writer.write_call(function_call, arg_num)
+            symbol = self.symbol_table.resolve(first_token)
+            if symbol is not None: #variable.method call
+                self.vm_writer.write_push(symbol.segment, symbol.index)
+                return _Call(symbol.type, second_token, 1, line)
+            return _Call(first_token, second_token, 0, line) #some class.function call
+        #method call
+        self.vm_writer.write_push("pointer", 0)
+        return _Call(self.class_name, first_token, 1, line)
+
+    def _finish_subroutine_call(self, call: _Call) -> None:
+        """Emits a call whose arguments were pushed, and advances over the
+        closing ).
+        """
+        if self.class_index is not None:
+            self._check_call(call.class_name, call.subroutine, call.arg_num,
+                             call.line, call.on_object)
+        self.vm_writer.write_call(f"{call.class_name}.{call.subroutine}",
+                                  call.arg_num)
         self.input_stream.advance()
 
+    def _check_call(self, class_name: str, subroutine: str, arg_num: int,
+                    line: int, on_object: bool) -> None:
+        """Checks a call against the class index.
+
+        Args:
+            class_name (str): the class the call goes to.
+            subroutine (str): the called subroutine.
+            arg_num (int): the number of arguments, including the object of
+            a method call.
+            line (int): where the call is, for error messages.
+            on_object (bool): whether the call is a method call on a variable
+            or on this.
+
+        Raises:
+            ValueError: if the call cannot work.
+        """
+        name = f"{class_name}.{subroutine}"
+        if class_name in ("int", "char", "boolean"):
+            raise ValueError(f"line {line}: cannot call {name}, {class_name} "
+                             f"values have no methods")
+        if not self.class_index.has_class(class_name):
+            raise ValueError(f"line {line}: unknown class or variable "
+                             f"'{class_name}' in call to {name}")
+        signature = self.class_index.lookup(class_name, subroutine)
+        if signature is None:
+            raise ValueError(f"line {line}: {class_name} has no subroutine "
+                             f"'{subroutine}'")
+        if on_object and signature.kind != "method":
+            raise ValueError(f"line {line}: {signature.kind} {name} is called "
+                             f"as a method")
+        if not on_object and signature.kind == "method":
+            raise ValueError(f"line {line}: method {name} is called without "
+                             f"an object")
+        given = arg_num - on_object
+        if given != signature.arity:
+            plural = "" if signature.arity == 1 else "s"
+            raise ValueError(f"line {line}: {name} takes {signature.arity} "
+                             f"argument{plural}, {given} given")
+
     def compile_let(self) -> None:
         """Compiles a let statement."""
         # current token is 'let'
         self.input_stream.advance()  # let -> varName
         var_name = self.input_stream.identifier()
         self.input_stream.advance()  # varName -> '=' or '['
-        is_array = self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() == "["
+        is_array = self._at_symbol("[")
         if is_array:
             self.input_stream.advance()  # '[' -> first token of index expression
             # leaves (base + index) on stack, and current at '='
@@ -215,9 +418,9 @@ class CompilationEngine:
             returns it with current token as the after }
         """
         self.input_stream.advance() # while -> (
-        label_while_start = f"WHILE_EXP_{CompilationEngine._while_counter}"
-        label_while_end = f"WHILE_END_{CompilationEngine._while_counter}"
-        CompilationEngine._while_counter += 1
+        label_while_start = f"{self._label_prefix}WHILE_EXP_{self._while_counter}"
+        label_while_end = f"{self._label_prefix}WHILE_END_{self._while_counter}"
+        self._while_counter += 1
         self.vm_writer.write_label(label_while_start)
         self.input_stream.advance() # ( -> first token of condition expression
         self.compile_expression()
@@ -233,7 +436,7 @@ class CompilationEngine:
     def compile_return(self) -> None:
         """Compiles a return statement."""
         self.input_stream.advance() # return -> expression or ;
-        if not (self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() == ";"):
+        if not self._at_symbol(";"):
             self.compile_expression()
         else:
             self.vm_writer.write_push("constant", 0)
@@ -245,9 +448,9 @@ class CompilationEngine:
         # Your code goes here!
         self.input_stream.advance() # if -> (
         self.input_stream.advance() # ( -> first token of condition expression
-        label_if_true = f"IF_TRUE_{CompilationEngine._if_else_counter}"
-        label_if_false = f"IF_FALSE_{CompilationEngine._if_else_counter}"
-        CompilationEngine._if_else_counter += 1
+        label_if_true = f"{self._label_prefix}IF_TRUE_{self._if_else_counter}"
+        label_if_false = f"{self._label_prefix}IF_FALSE_{self._if_else_counter}"
+        self._if_else_counter += 1
         self.compile_expression()
         self.vm_writer.write_arithmetic('not')
         self.vm_writer.write_if(label_if_false)
@@ -258,7 +461,7 @@ class CompilationEngine:
         self.vm_writer.write_goto(label_if_true)
         self.vm_writer.write_label(label_if_false)
         # Optional else clause
-        if self.input_stream.keyword() == "else":
+        if self._current_keyword() == "else":
             self.input_stream.advance() # else -> {
             self.input_stream.advance() # { -> first token of statements
             self.compile_statements()
@@ -271,12 +474,236 @@ class CompilationEngine:
         Should finish at the ) or ] or , token as current
         starts after advancing to the first token
         """
-        self.compile_term()
-        while self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() in self.input_stream.ops:
-            operand = self.input_stream.symbol()
-            self.input_stream.advance()
-            self.compile_term()
+        value = self._compile_expression_value()
+        if value is not None:
+            self.push_constant(value)
+
+    def _compile_expression_value(self, single_term: bool = False
+                                  ) -> typing.Optional[int]:
+        """Compiles an expression like compile_expression, except that when
+        optimizing, an expression made of constants only emits nothing.
+        Returns its 16-bit value in that case, and None otherwise.
+
+        The parser keeps its state on explicit stacks instead of recursing,
+        so nesting depth is only bounded by memory. Operators wait on the
+        pending stack, together with the open parentheses, array indexes and
+        call argument lists, until an operator that binds less tightly or the
+        end of the bracket applies them. Operands are compiled as they are
+        read; the value stack keeps the constant of every operand not applied
+        yet, or None if it was emitted, and where its code starts.
+
+        Args:
+            single_term (bool): stop after the first term, see compile_term.
+        """
+        stream = self.input_stream
+        words = self.vm_writer.code.words
+        binary_ops = self._binary_ops
+        unary_ops = self._unary_ops
+        precedence = self._precedence
+        # Entries are (kind, operator, precedence) for binary operators,
+        # (kind, operator, code start) for unary ones and (kind, call or
+        # None, code start) for brackets.
+        pending: typing.List[typing.Tuple[int, typing.Any, int]] = [
+            (_BOTTOM, None, 0)]
+        values: typing.List[typing.Tuple[typing.Optional[int], int]] = []
+        while True:
+            # An operand: unary operators and opening brackets, then a term.
+            token = stream.current
+            kind = token.kind
+            start = len(words)
+            value = None
+            if kind is TokenKind.SYMBOL:
+                if token.value in unary_ops:
+                    pending.append((_UNARY, token.value, start))
+                    stream.advance()
+                    continue
+                if token.value == "(":
+                    pending.append((_GROUP, None, start))
+                    stream.advance()
+                    continue
+            if kind is TokenKind.INT_CONST:
+                constant = int(token.value)
+                if constant > _MAX_INT_CONST:
+                    raise ValueError(f"line {token.line}: integer constant "
+                                     f"{constant} is out of range "
+                                     f"0..{_MAX_INT_CONST}")
+                stream.advance()
+                if self.optimize:
+                    value = constant
+                else:
+                    self.vm_writer.write_push("constant", constant)
+            elif kind is TokenKind.STRING_CONST:
+                self.handle_string_literal()
+                stream.advance()
+            elif kind is TokenKind.KEYWORD and token.value in _KEYWORD_CONSTANTS:
+                stream.advance()
+                if self.optimize and token.value != "this":
+                    value = -1 if token.value == "true" else 0
+                else:
+                    self.handle_key_words(token.value)
+            else: # an identifier / subroutine call
+                first_token = token.value
+                stream.advance()
+                token = stream.current
+                if token.kind is not TokenKind.SYMBOL:
+                    self.push_variable(first_token)
+                elif token.value == "[":
+                    self.push_variable(first_token)
+                    pending.append((_INDEX, None, start))
+                    stream.advance()
+                    continue
+                elif token.value in _CALL_SYMBOLS:
+                    call = self._start_subroutine_call(first_token)
+                    if not self._at_symbol(")"):
+                        pending.append((_CALL, call, start))
+                        continue
+                    self._finish_subroutine_call(call)
+                else:
+                    self.push_variable(first_token)
+            values.append((value, start))
+
+            # After an operand: apply its unary operators, then the binary
+            # operators that bind at least as tightly as the next one, which
+            # is all of them up to the innermost bracket when it is not one.
+            while True:
+                top = pending[-1]
+                while top[0] == _UNARY:
+                    self._apply_unary(pending.pop()[1], values)
+                    top = pending[-1]
+                if single_term and top[0] == _BOTTOM:
+                    return values[0][0]
+                token = stream.current
+                symbol = token.value if token.kind is TokenKind.SYMBOL else ""
+                level = precedence.get(symbol, -1)
+                while top[0] == _BINARY and top[2] >= level:
+                    operand = top[1]
+                    pending.pop()
+                    top = pending[-1]
+                    right, right_start = values.pop()
+                    left, left_start = values[-1]
+                    if left is None and right is None:
+                        binary_ops[operand]()
+                    else:
+                        # A constant left side emitted nothing, so it starts
+                        # where the right side does.
+                        values[-1] = (self._fold_op(operand, left, right,
+                                                    right_start), left_start)
+                if level >= 0:
+                    pending.append((_BINARY, symbol, level))
+                    stream.advance()
+                    break
+                entry, call, start = top
+                if entry == _BOTTOM:
+                    # The ) ] , or ; after the expression.
+                    return values[0][0]
+                if entry == _GROUP and symbol == ")":
+                    pending.pop()
+                    stream.advance()
+                elif entry == _INDEX and symbol == "]":
+                    pending.pop()
+                    stream.advance()
+                    self._push_value(values.pop())
+                    self._finish_array_entry(push_value=True)
+                    values.append((None, start))
+                elif entry == _CALL and symbol in (",", ")"):
+                    self._push_value(values.pop())
+                    call.arg_num += 1
+                    if symbol == ",":
+                        stream.advance()
+                        break
+                    pending.pop()
+                    self._finish_subroutine_call(call)
+                    values.append((None, start))
+                else:
+                    closer = "]" if entry == _INDEX else ")"
+                    raise ValueError(f"line {token.line}: expected {closer} "
+                                     f"but found {token.value}")
+
+    def _apply_unary(self, op: str,
+                     values: typing.List[typing.Tuple[typing.Optional[int], int]]
+                     ) -> None:
+        value, start = values[-1]
+        if value is not None:
+            folded = _CONSTANT_UNARY_OPS[op](value)
+            if folded is not None:
+                values[-1] = (to_int16(folded), start)
+                return
+            self.push_constant(value)
+            values[-1] = (None, start)
+        self._unary_ops[op]()
+
+    def _push_value(self, value: typing.Tuple[typing.Optional[int], int]) -> None:
+        """Pushes an operand that was not emitted because it is constant."""
+        if value[0] is not None:
+            self.push_constant(value[0])
+
+    def _fold_op(self, operand: str, left: typing.Optional[int],
+                 right: typing.Optional[int], right_start: int) -> typing.Optional[int]:
+        """Applies a binary operator when at least one side is a constant that
+        was not emitted. The code of a non-constant right side starts at
+        right_start.
+
+        Returns:
+            typing.Optional[int]: the folded value if both sides are
+            constants, and None once the operation has been emitted.
+        """
+        if left is not None and right is not None:
+            value = _CONSTANT_OPS[operand](left, right)
+            if value is not None:
+                return to_int16(value)
+            self.push_constant(left)
+            self.push_constant(right)
             self.handle_op(operand)
+        elif right is not None:
+            if not self._reduce_op(operand, right, constant_is_left=False):
+                self.push_constant(right)
+                self.handle_op(operand)
+        elif not self._reduce_op(operand, left, constant_is_left=True):
+            # The constant goes in front of the right side's code.
+            code = self.vm_writer.code
+            start = len(code)
+            self.push_constant(left)
+            code.move_tail(start, right_start)
+            self.handle_op(operand)
+        return None
+
+    def _reduce_op(self, operand: str, constant: int, constant_is_left: bool) -> bool:
+        """Emits a cheaper equivalent of an operation between the value on
+        the stack and a constant: identities disappear, multiplying by -1
+        becomes neg and multiplying by a power of two becomes shifts.
+        Dividing by a power of two is not reduced, because Math.divide
+        rounds negative quotients towards zero and a shift does not.
+
+        Returns:
+            bool: whether the operation was emitted.
+        """
+        if operand == "*" or (operand == "/" and not constant_is_left):
+            if constant == 1:
+                return True
+            if constant == -1:
+                self.vm_writer.write_arithmetic("neg")
+                return True
+            if operand == "*" and constant > 0 and constant & (constant - 1) == 0:
+                for _ in range(constant.bit_length() - 1):
+                    self.vm_writer.write_arithmetic("shiftleft")
+                return True
+        elif operand == "+" or operand == "|":
+            return constant == 0
+        elif operand == "&":
+            return constant == -1
+        elif operand == "-" and constant == 0:
+            if constant_is_left:
+                self.vm_writer.write_arithmetic("neg")
+            return True
+        return False
+
+    def push_constant(self, value: int) -> None:
+        """Pushes a signed 16-bit value."""
+        for opcode, _, index in constant_code(value):
+            if opcode == PUSH:
+                self.vm_writer.write_push("constant", index)
+            else:
+                self.vm_writer.write_arithmetic(ARITHMETIC_NAMES[opcode])
 
    # *VX         
     def handle_key_words(self, keyword: str) -> None:
@@ -288,35 +715,8 @@ class CompilationEngine:
         elif keyword == "this":
                 self.vm_writer.write_push("pointer", 0)
             
-    def handle_op(self, operand: str) -> str:
-        if operand == "+":
-            self.vm_writer.write_arithmetic("add")
-        elif operand == "-":
-            self.vm_writer.write_arithmetic("sub")
-        elif operand == "*":
-            self.vm_writer.write_call("Math.multiply", 2)
-        elif operand == "/":
-            self.vm_writer.write_call("Math.divide", 2)
-        elif operand == "&":
-            self.vm_writer.write_arithmetic("and")
-        elif operand == "|":
-            self.vm_writer.write_arithmetic("or")
-        elif operand == "<":
-            self.vm_writer.write_arithmetic("lt")
-        elif operand == ">":
-            self.vm_writer.write_arithmetic("gt")
-        elif operand == "=":
-            self.vm_writer.write_arithmetic("eq")
-    
-    def handle_unary_op(self, unary_op: str) -> None:
-        if unary_op == "-":
-            self.vm_writer.write_arithmetic("neg")
-        elif unary_op == "~":
-            self.vm_writer.write_arithmetic("not")
-        elif unary_op == "^":
-            self.vm_writer.write_arithmetic("shiftLeft")
-        elif unary_op == "#":
-            self.vm_writer.write_arithmetic("shiftRight")
+    def handle_op(self, operand: str) -> None:
+        self._binary_ops[operand]()
 
     # *VX
     def compile_term(self) -> None:
@@ -331,37 +731,9 @@ class CompilationEngine:
         to distinguish between the three possibilities. Any other token is not
         part of this term and should not be advanced over.
         """
-        first_token = ""
-        if self.input_stream.token_type() == "INT_CONST":
-            self.vm_writer.write_push("constant", self.input_stream.int_val())
-            self.input_stream.advance()
-        elif self.input_stream.token_type() == "STRING_CONST":
-            self.handle_string_literal()
-            self.input_stream.advance()
-        elif self.input_stream.token_type() == "KEYWORD" and self.input_stream.keyword() in ["true", "false", "null", "this"]:
-            self.handle_key_words(self.input_stream.keyword())
-            self.input_stream.advance()
-        elif self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() == "(":
-            self.input_stream.advance()
-            self.compile_expression()
-            # should return with the ')' sign that I'll advance over
-            self.input_stream.advance()
-        elif self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() in self.input_stream.unaryOps:
-            op = self.input_stream.symbol()
-            self.input_stream.advance()
-            self.compile_term()
-            self.handle_unary_op(op)
-        else: # an identifier / subroutine call
-            first_token = self.input_stream.identifier()
-            self.input_stream.advance()
-            if self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() == "[":
-                self.input_stream.advance()
-                self.push_array_entry(first_token, push_value=True)
-            elif self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() in ["(", "."]:
-                self.compile_subroutine_call(first_token = first_token)
-            else:
-                self.push_variable(first_token)
-
+        value = self._compile_expression_value(single_term=True)
+        if value is not None:
+            self.push_constant(value)
 
     def push_array_entry(self, var_name: str, push_value: bool) -> None:
         # recieves the array name as var_name, recieve the tokeneizer after the '[' returns it after the ']'
@@ -369,32 +741,73 @@ class CompilationEngine:
         self.push_variable(var_name)
         self.compile_expression()
         self.input_stream.advance() #over the ']'
+        self._finish_array_entry(push_value)
+
+    def _finish_array_entry(self, push_value: bool) -> None:
+        # adds the index on the stack to the array address under it
         self.vm_writer.write_arithmetic("add")
         if push_value:
             self.vm_writer.write_pop("pointer", 1)
             self.vm_writer.write_push("that", 0)
 
     def push_variable(self, var_name: str) -> None:
-        self.vm_writer.write_push(self.symbol_table.kind_of(var_name), self.symbol_table.index_of(var_name))
+        symbol = self._resolve(var_name)
+        self.vm_writer.write_push(symbol.segment, symbol.index)
 
     def pop_variable(self, var_name: str) -> None:
-        self.vm_writer.write_pop(self.symbol_table.kind_of(var_name), self.symbol_table.index_of(var_name))
+        symbol = self._resolve(var_name)
+        self.vm_writer.write_pop(symbol.segment, symbol.index)
+
+    def _resolve(self, var_name: str) -> Symbol:
+        symbol = self.symbol_table.resolve(var_name)
+        if symbol is None:
+            raise ValueError(f"line {self.input_stream.current.line}: "
+                             f"unknown variable {var_name}")
+        return symbol
 
     def handle_string_literal(self) -> None:
         this_string = self.input_stream.string_val()
+        if self.pool_strings:
+            index = self._pooled_strings.setdefault(
+                this_string, len(self._pooled_strings))
+            self.vm_writer.write_call(f"{self.class_name}.$string{index}", 0)
+        else:
+            self.write_new_string(this_string)
+
+    def write_new_string(self, this_string: str) -> None:
+        """Pushes a newly allocated copy of the given string."""
         self.vm_writer.write_push("constant", len(this_string))
         self.vm_writer.write_call("String.new", 1)
         for char in this_string:
             self.vm_writer.write_push("constant", ord(char))
             self.vm_writer.write_call("String.appendChar", 2)
 
+    def _write_string_pool(self) -> None:
+        """Writes a function for every pooled string literal. The first call
+        builds the string and keeps it in a static variable, placed after the
+        class's own statics, and every call returns that string.
+        """
+        first_static = self.symbol_table.var_count("STATIC")
+        for this_string, index in self._pooled_strings.items():
+            static = first_static + index
+            function_name = f"{self.class_name}.$string{index}"
+            ready_label = f"{function_name}$STRING_READY"
+            self.vm_writer.write_function(function_name, 0)
+            self.vm_writer.write_push("static", static)
+            self.vm_writer.write_if(ready_label)
+            self.write_new_string(this_string)
+            self.vm_writer.write_pop("static", static)
+            self.vm_writer.write_label(ready_label)
+            self.vm_writer.write_push("static", static)
+            self.vm_writer.write_return()
+
     # *VX
     def compile_expression_list(self) -> int:
         # this function ends up pushing into the stack all the expressions in the list inside a function call
         num_expressions = 0
-        while not (self.input_stream.token_type () == "SYMBOL" and self.input_stream.symbol() == ")"):
+        while not self._at_symbol(")"):
             self.compile_expression()
             num_expressions += 1
-            if self.input_stream.token_type() == "SYMBOL" and self.input_stream.symbol() == ",":
+            if self._at_symbol(","):
                 self.input_stream.advance()   
         return num_expressions
@@ -0,0 +1,152 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import contextlib
+import functools
+import json
+import time
+import typing
+from JackLexer import source_stats
+
+# The CompilationEngine methods that hooks are called around. There is one
+# compile_subroutine_dec call per subroutine, and one compile_expression call
+# per expression of a statement: nested expressions are parsed within it.
+PHASES = ("compile_class", "compile_subroutine_dec", "compile_statements",
+          "compile_expression")
+
+
+class CompileHooks:
+    """Callbacks around the compilation phases of a CompilationEngine. The
+    defaults do nothing; subclasses override what they need.
+    """
+
+    def enter(self, phase: str, engine: typing.Any) -> None:
+        """Called when the engine starts a phase.
+
+        Args:
+            phase (str): one of PHASES.
+            engine (CompilationEngine): the engine, positioned at the first
+            token of the construct.
+        """
+
+    def exit(self, phase: str, engine: typing.Any) -> None:
+        """Called when the engine finished a phase, also if it raised.
+
+        Args:
+            phase (str): one of PHASES.
+            engine (CompilationEngine): the engine.
+        """
+
+
+def instrument(engine: typing.Any, hooks: CompileHooks) -> None:
+    """Wraps the phase methods of one engine with calls to hooks. Only that
+    instance is changed, so engines without hooks pay nothing.
+
+    Args:
+        engine (CompilationEngine): the engine, before it compiles.
+        hooks (CompileHooks): the callbacks.
+    """
+    for phase in PHASES:
+        setattr(engine, phase, _hooked(getattr(engine, phase), phase, engine,
+                                       hooks))
+
+
+def _hooked(method: typing.Callable, phase: str, engine: typing.Any,
+            hooks: CompileHooks) -> typing.Callable:
+    @functools.wraps(method)
+    def hooked(*args, **kwargs):
+        hooks.enter(phase, engine)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            hooks.exit(phase, engine)
+    return hooked
+
+
+class CompileProfiler(CompileHooks):
+    """Measures where compile time goes: the time and calls of every phase
+    and the time of every subroutine of every file, together with the lexer
+    counters of the file. A phase's time includes the phases it runs, and
+    nested calls of the same phase are only timed once.
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.perf_counter
+                 ) -> None:
+        """
+        Args:
+            clock (typing.Callable[[], float]): returns the time in seconds.
+        """
+        self.clock = clock
+        self.files: typing.List[typing.Dict[str, typing.Any]] = []
+        self._file: typing.Dict[str, typing.Any] = {}
+        # The start time and subroutine name of every phase being run.
+        self._starts: typing.List[typing.Tuple[float, str]] = []
+        self._depths = dict.fromkeys(PHASES, 0)
+
+    @contextlib.contextmanager
+    def file(self, path: str) -> typing.Iterator[None]:
+        """Profiles the compilation of one file, run inside the context.
+
+        Args:
+            path (str): path of the .jack file.
+        """
+        with open(path, 'r', errors="replace") as source_file:
+            stats = source_stats(source_file.read())
+        self._file = {"path": path, "seconds": 0.0, **stats._asdict(),
+                      "phases": {phase: {"calls": 0, "seconds": 0.0}
+                                 for phase in PHASES},
+                      "subroutines": []}
+        self.files.append(self._file)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self._file["seconds"] = self.clock() - start
+            self._file["subroutines"].sort(key=lambda entry: -entry["seconds"])
+
+    def enter(self, phase: str, engine: typing.Any) -> None:
+        name = ""
+        if phase == "compile_subroutine_dec":
+            # The current token is the subroutine kind, then come the return
+            # type and the name.
+            name = f"{engine.class_name}.{engine.input_stream.peek(2).value}"
+        self._depths[phase] += 1
+        self._starts.append((self.clock(), name))
+
+    def exit(self, phase: str, engine: typing.Any) -> None:
+        start, name = self._starts.pop()
+        elapsed = self.clock() - start
+        self._depths[phase] -= 1
+        totals = self._file["phases"][phase]
+        totals["calls"] += 1
+        if not self._depths[phase]:
+            totals["seconds"] += elapsed
+        if name:
+            self._file["subroutines"].append({"name": name,
+                                              "seconds": elapsed})
+
+    def report(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns:
+            typing.Dict[str, typing.Any]: every profiled file, slowest first,
+            with the totals over all of them.
+        """
+        files = sorted(self.files, key=lambda entry: -entry["seconds"])
+        return {"seconds": sum(entry["seconds"] for entry in files),
+                "tokens": sum(entry["tokens"] for entry in files),
+                "lines": sum(entry["lines"] for entry in files),
+                "files": files}
+
+    def write(self, path: str) -> None:
+        """Writes the report as JSON.
+
+        Args:
+            path (str): the output file.
+        """
+        with open(path, 'w') as output_file:
+            json.dump(self.report(), output_file, indent=2)
+            output_file.write("\n")
@@ -0,0 +1,123 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+A long-lived compile server, which keeps the compiler loaded between builds.
+Every request is one JSON line:
+
+    {"cwd": "/path/to/project", "args": ["Square", "-O"]}
+
+and runs exactly what "JackCompiler <args>" would run in that directory. The
+reply is one JSON line too:
+
+    {"status": 0, "stdout": "...", "stderr": "..."}
+
+Requests are served one at a time. The server keeps running the compiler
+modules it started with, so restart it after changing them.
+
+Usage: python CompileServer.py --stdio
+       python CompileServer.py --socket PATH
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socketserver
+import sys
+import typing
+import JackCompiler
+
+
+def handle_request(line: str) -> str:
+    """Runs one compile request.
+
+    Args:
+        line (str): a JSON request, see the module documentation.
+
+    Returns:
+        str: the JSON reply, without a trailing newline.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    status = 0
+    previous_cwd = os.getcwd()
+    try:
+        request = json.loads(line)
+        os.chdir(request.get("cwd", previous_cwd))
+        with contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(stderr):
+            JackCompiler.main(request["args"])
+    except SystemExit as stop:
+        # Like the interpreter: a message means status 1.
+        if isinstance(stop.code, str):
+            print(stop.code, file=stderr)
+            status = 1
+        else:
+            status = stop.code or 0
+    except Exception as error:
+        print(f"{type(error).__name__}: {error}", file=stderr)
+        status = 1
+    finally:
+        os.chdir(previous_cwd)
+    return json.dumps({"status": status, "stdout": stdout.getvalue(),
+                       "stderr": stderr.getvalue()})
+
+
+def serve_stdio(input_stream: typing.TextIO,
+                output_stream: typing.TextIO) -> None:
+    """Answers requests read from input_stream, one per line, until it ends.
+
+    Args:
+        input_stream (typing.TextIO): where requests are read from.
+        output_stream (typing.TextIO): where replies are written to.
+    """
+    for line in input_stream:
+        if line.strip():
+            output_stream.write(handle_request(line) + "\n")
+            output_stream.flush()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if line.strip():
+                reply = handle_request(line.decode()) + "\n"
+                self.wfile.write(reply.encode())
+
+
+def serve_socket(path: str) -> None:
+    """Answers requests on a Unix domain socket until interrupted. A client
+    may send any number of requests on one connection.
+
+    Args:
+        path (str): path of the socket, replaced if it already exists.
+    """
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+    with socketserver.UnixStreamServer(path, _RequestHandler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+
+if "__main__" == __name__:
+    parser = argparse.ArgumentParser(
+        prog="CompileServer",
+        usage="CompileServer (--stdio | --socket PATH)")
+    transport = parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument(
+        "--stdio", action="store_true",
+        help="read requests from stdin and write replies to stdout")
+    transport.add_argument(
+        "--socket", metavar="PATH", help="listen on a Unix domain socket")
+    args = parser.parse_args()
+    if args.stdio:
+        serve_stdio(sys.stdin, sys.stdout)
+    else:
+        serve_socket(args.socket)
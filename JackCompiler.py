@@ -5,50 +5,825 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import argparse
+import concurrent.futures
+import cProfile
+import hashlib
+import io
 import os
 import sys
+import time
 import typing
+import CallGraph
+from BuildCache import BuildCache
+from ClassIndex import ClassIndex
 from CompilationEngine import CompilationEngine
+from CompileProfiler import CompileHooks, CompileProfiler
+from JackLexer import tokenize
 from JackTokenizer import JackTokenizer
 from SymbolTable import SymbolTable
+from VMBinary import write_binary
+from VMCode import CALL, FUNCTION, VMCode, parse, serialize
+from VMInliner import INLINE_BUDGET, inlinable_bodies, inline_calls
+from VMOptimizer import optimize_code
 from VMWriter import VMWriter
 
 
+# Seconds between two scans of the watched tree.
+WATCH_INTERVAL = 0.5
+
+
+class CompileOptions(typing.NamedTuple):
+    """Settings that change the emitted code. They are part of every build
+    cache key, so builds with different options never share cache entries.
+    """
+    # Run the peephole optimizer over every class.
+    optimize: bool = False
+    # Build every distinct string literal once and reuse it.
+    pool_strings: bool = False
+    # Inline calls to subroutines of at most this many VM commands, 0 never
+    # inlines.
+    inline: int = 0
+    # Parse binary operators with conventional precedence instead of Jack's
+    # left to right order.
+    precedence: bool = False
+    # Also write every class in the binary .vmb format, see VMBinary, next
+    # to its .vm file.
+    binary: bool = False
+
+
+class ProgramResult(typing.NamedTuple):
+    """What compile_program did."""
+    # The (path, error message) pairs of the files that failed to compile.
+    errors: typing.List[typing.Tuple[str, str]]
+    # The name and number of VM commands of every removed subroutine.
+    removed: typing.List[typing.Tuple[str, int]]
+    # The caller and the callee of every inlined call site.
+    inlined: typing.List[typing.Tuple[str, str]]
+
+
 def compile_file(
-        input_file: typing.TextIO, output_file: typing.TextIO) -> None:
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        options: CompileOptions = CompileOptions(),
+        class_index: typing.Optional[ClassIndex] = None) -> VMCode:
     """Compiles a single file.
 
     Args:
         input_file (typing.TextIO): the file to compile.
         output_file (typing.TextIO): writes all output to this file.
+        options (CompileOptions): code generation settings.
+        class_index (typing.Optional[ClassIndex]): if given, calls are
+        checked against the signatures of the whole program.
+
+    Returns:
+        VMCode: the code written to output_file.
     """
     # Your code goes here!
     # This function should be relatively similar to "analyze_file" in
     # JackAnalyzer.py from the previous project.
     tokenizer = JackTokenizer(input_file)
-    compilation_engine = CompilationEngine(tokenizer, output_file)
+    return compile_tokens(tokenizer, output_file, options, class_index)
 
 
-if "__main__" == __name__:
-    # Parses the input path and calls compile_file on each input file.
-    # This opens both the input and the output files!
-    # Both are closed automatically when the code finishes running.
-    # If the output file does not exist, it is created automatically in the
-    # correct path, using the correct filename.
-    if not len(sys.argv) == 2:
-        sys.exit("Invalid usage, please use: JackCompiler <input path>")
-    argument_path = os.path.abspath(sys.argv[1])
+def compile_tokens(
+        tokenizer: JackTokenizer, output_file: typing.TextIO,
+        options: CompileOptions = CompileOptions(),
+        class_index: typing.Optional[ClassIndex] = None,
+        hooks: typing.Optional[CompileHooks] = None) -> VMCode:
+    """Compiles the class a tokenizer reads.
+
+    Args:
+        tokenizer (JackTokenizer): the tokens of a single class.
+        output_file (typing.TextIO): writes all output to this file.
+        options (CompileOptions): code generation settings.
+        class_index (typing.Optional[ClassIndex]): see compile_file.
+        hooks (typing.Optional[CompileHooks]): callbacks to run around the
+        compilation phases.
+
+    Returns:
+        VMCode: the code written to output_file.
+    """
+    compilation_engine = CompilationEngine(
+        tokenizer, output_file, optimize=options.optimize,
+        pool_strings=options.pool_strings, class_index=class_index,
+        inline_budget=options.inline, hooks=hooks,
+        precedence=options.precedence)
+    return compilation_engine.vm_writer.code
+
+
+def compile_path(input_path: str, cache_dir: typing.Optional[str] = None,
+                 options: CompileOptions = CompileOptions(),
+                 class_index: typing.Optional[ClassIndex] = None) -> str:
+    """Compiles a single .jack file into the .vm file next to it. The output
+    file is only written once the whole class compiled successfully.
+
+    Args:
+        input_path (str): path of the .jack file.
+        cache_dir (typing.Optional[str]): if given, a BuildCache directory.
+        Unchanged sources are restored from it instead of being compiled,
+        and an up to date .vm file is not rewritten at all.
+        options (CompileOptions): code generation settings.
+        class_index (typing.Optional[ClassIndex]): see compile_file.
+
+    Returns:
+        str: path of the written .vm file.
+    """
+    output_path = os.path.splitext(input_path)[0] + ".vm"
+    binary_path = os.path.splitext(input_path)[0] + ".vmb"
+    cache = BuildCache(cache_dir) if cache_dir else None
+    vm_code = None
+    code = None
+    if cache is not None:
+        with open(input_path, 'rb') as input_file:
+            source = input_file.read()
+        # A class checked against other classes is only up to date if
+        # their signatures did not change either.
+        key = cache.key(source, repr(options) if class_index is None else
+                        f"{options!r} {class_index.fingerprint()}")
+        vm_code = cache.get(key)
+        if vm_code is not None and _read_if_exists(output_path) == vm_code \
+                and (not options.binary or
+                     _is_newer(binary_path, output_path)):
+            return output_path
+    if vm_code is None:
+        output = io.StringIO()
+        if cache is None:
+            # Nothing needs the whole source, so it is tokenized straight
+            # from the memory-mapped file.
+            code = compile_tokens(JackTokenizer.from_path(input_path),
+                                  output, options, class_index)
+        else:
+            # Decoded as open(input_path, 'r') would, like the uncached
+            # path does for sources that are not ASCII.
+            code = compile_file(io.TextIOWrapper(io.BytesIO(source)), output,
+                                options, class_index)
+        vm_code = output.getvalue()
+        if cache is not None:
+            cache.put(key, vm_code)
+    with open(output_path, 'w') as output_file:
+        output_file.write(vm_code)
+    if options.binary:
+        # Written after the .vm file, so that a .vmb file at least as new
+        # as its .vm file is up to date. The cache only keeps the text.
+        write_binary(code if code is not None else parse(vm_code),
+                     binary_path)
+    return output_path
+
+
+def _is_newer(path: str, other_path: str) -> bool:
+    """Whether path exists and was modified no earlier than other_path."""
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(other_path)
+    except OSError:
+        return False
+
+
+def _read_if_exists(path: str) -> typing.Optional[str]:
+    try:
+        with open(path, 'r') as existing_file:
+            return existing_file.read()
+    except FileNotFoundError:
+        return None
+
+
+def compile_paths(input_paths: typing.List[str], jobs: int = 1,
+                  cache_dir: typing.Optional[str] = None,
+                  options: CompileOptions = CompileOptions(),
+                  class_index: typing.Optional[ClassIndex] = None
+                  ) -> typing.List[typing.Tuple[str, str]]:
+    """Compiles every given .jack file, optionally on a pool of processes.
+    Every class compiles independently of the others, so the output does not
+    depend on how the files are scheduled.
+
+    Args:
+        input_paths (typing.List[str]): paths of the .jack files.
+        jobs (int): number of worker processes, 1 compiles in this process.
+        cache_dir (typing.Optional[str]): BuildCache directory, see
+        compile_path.
+        options (CompileOptions): code generation settings.
+        class_index (typing.Optional[ClassIndex]): see compile_file.
+
+    Returns:
+        typing.List[typing.Tuple[str, str]]: a (path, error message) pair for
+        every file that failed to compile, in the order of input_paths.
+    """
+    errors = []
+    if jobs <= 1 or len(input_paths) <= 1:
+        for input_path in input_paths:
+            try:
+                compile_path(input_path, cache_dir, options, class_index)
+            except Exception as error:
+                errors.append((input_path, f"{type(error).__name__}: {error}"))
+        return errors
+    # The index is sent to every worker once, not with every file.
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=_set_worker_index,
+            initargs=(class_index,)) as executor:
+        futures = [executor.submit(
+                       _compile_path_in_worker, input_path, cache_dir, options)
+                   for input_path in input_paths]
+        for input_path, future in zip(input_paths, futures):
+            try:
+                future.result()
+            except Exception as error:
+                errors.append((input_path, f"{type(error).__name__}: {error}"))
+    return errors
+
+
+def compile_program(input_paths: typing.List[str],
+                    options: CompileOptions = CompileOptions(),
+                    class_index: typing.Optional[ClassIndex] = None,
+                    gc_functions: bool = True) -> ProgramResult:
+    """Compiles all the classes of a program in memory, then runs the
+    whole-program passes over them, see link_program. Nothing is written
+    unless every class compiled. This runs in one process and does not use
+    the build cache, since a class's code then depends on other classes'
+    code.
+
+    Args:
+        input_paths (typing.List[str]): paths of all the program's .jack
+        files.
+        options (CompileOptions): code generation settings.
+        class_index (typing.Optional[ClassIndex]): see compile_file.
+        gc_functions (bool): whether to remove unreachable subroutines.
+
+    Returns:
+        ProgramResult: the files that failed to compile, as compile_paths,
+        the removed subroutines and the inlined call sites.
+    """
+    codes: typing.Dict[str, VMCode] = {}
+    errors = []
+    for input_path in input_paths:
+        try:
+            codes[input_path] = _compile_class(
+                JackTokenizer.from_path(input_path),
+                options._replace(inline=0), class_index)
+        except Exception as error:
+            errors.append((input_path, f"{type(error).__name__}: {error}"))
+    if errors:
+        return ProgramResult(errors, [], [])
+    removed, inlined = link_program(codes.values(), options, gc_functions)
+    for input_path, code in codes.items():
+        output_path = os.path.splitext(input_path)[0] + ".vm"
+        with open(output_path, 'w') as output_file:
+            output_file.write(serialize(code))
+        if options.binary:
+            write_binary(code, os.path.splitext(input_path)[0] + ".vmb")
+    return ProgramResult(errors, removed, inlined)
+
+
+def link_program(codes: typing.Iterable[VMCode],
+                 options: CompileOptions = CompileOptions(),
+                 gc_functions: bool = True
+                 ) -> typing.Tuple[typing.List[typing.Tuple[str, int]],
+                                   typing.List[typing.Tuple[str, str]]]:
+    """Runs the passes that need the code of every class of a program, in
+    place: with options.inline, calls to small subroutines of any class are
+    inlined, and with gc_functions, every subroutine that cannot run is
+    removed: only what the entry points reach through the calls in the
+    emitted code is kept.
+
+    Args:
+        codes (typing.Iterable[VMCode]): the code of every class, compiled
+        without inlining.
+        options (CompileOptions): code generation settings.
+        gc_functions (bool): whether to remove unreachable subroutines.
+
+    Returns:
+        typing.Tuple[typing.List[typing.Tuple[str, int]],
+        typing.List[typing.Tuple[str, str]]]: the removed subroutines and
+        the inlined call sites, as in ProgramResult.
+    """
+    codes = list(codes)
+    inlined = []
+    if options.inline > 0:
+        bodies = {}
+        for code in codes:
+            bodies.update(inlinable_bodies(code, options.inline))
+        for code in codes:
+            sites = inline_calls(code, bodies)
+            if sites and options.optimize:
+                optimize_code(code)
+            inlined.extend(sites)
+    removed = []
+    if gc_functions:
+        graph = CallGraph.call_graph(codes)
+        keep = CallGraph.reachable(graph, CallGraph.roots(graph))
+        for code in codes:
+            removed.extend(CallGraph.remove_subroutines(code, keep))
+    return removed, inlined
+
+
+class CompileError(Exception):
+    """Raised by compile_many when classes fail to compile."""
+
+    def __init__(self, errors: typing.List[typing.Tuple[str, str]]) -> None:
+        """
+        Args:
+            errors (typing.List[typing.Tuple[str, str]]): the (name, error
+            message) pairs of the classes that failed.
+        """
+        super().__init__("; ".join(f"{name}: {message}"
+                                   for name, message in errors))
+        self.errors = errors
+
+
+def _compile_class(tokenizer: JackTokenizer, options: CompileOptions,
+                   class_index: typing.Optional[ClassIndex]) -> VMCode:
+    engine = CompilationEngine(
+        tokenizer, None, optimize=options.optimize,
+        pool_strings=options.pool_strings, class_index=class_index,
+        inline_budget=options.inline, precedence=options.precedence)
+    return engine.vm_writer.code
+
+
+def compile_code(source: str, options: CompileOptions = CompileOptions(),
+                 class_index: typing.Optional[ClassIndex] = None) -> VMCode:
+    """Compiles the source of one class in memory.
+
+    Args:
+        source (str): the Jack source code of the class.
+        options (CompileOptions): code generation settings. Inlining only
+        inlines calls within the class.
+        class_index (typing.Optional[ClassIndex]): see compile_file.
+
+    Returns:
+        VMCode: the compiled code, as packed instructions.
+
+    Raises:
+        ValueError: on invalid source code.
+    """
+    return _compile_class(JackTokenizer.from_tokens(tokenize(source)),
+                          options, class_index)
+
+
+def compile_source(source: str, options: CompileOptions = CompileOptions(),
+                   class_index: typing.Optional[ClassIndex] = None) -> str:
+    """Compiles the source of one class in memory, without touching the
+    filesystem. Compilations share no state, so any number of them may run
+    at once on different threads.
+
+    Args:
+        source (str): the Jack source code of the class.
+        options (CompileOptions): see compile_code.
+        class_index (typing.Optional[ClassIndex]): see compile_file.
+
+    Returns:
+        str: the VM code, as the .vm file would contain it.
+
+    Raises:
+        ValueError: on invalid source code.
+    """
+    return serialize(compile_code(source, options, class_index))
+
+
+def compile_many_code(sources: typing.Dict[str, str],
+                      options: CompileOptions = CompileOptions(),
+                      whole_program: bool = False,
+                      gc_functions: bool = False) -> typing.Dict[str, VMCode]:
+    """Compiles the classes of a program in memory, and runs the
+    whole-program passes over them, see link_program.
+
+    Args:
+        sources (typing.Dict[str, str]): the Jack source code of every class,
+        by any name, e.g. class or file name.
+        options (CompileOptions): code generation settings.
+        whole_program (bool): whether to check every call against the
+        signatures of the given classes and the OS.
+        gc_functions (bool): whether to remove unreachable subroutines.
+
+    Returns:
+        typing.Dict[str, VMCode]: the compiled code of every class, by the
+        same names.
+
+    Raises:
+        CompileError: listing every class that failed to compile.
+    """
+    class_index = None
+    if whole_program:
+        class_index = ClassIndex()
+        for source in sources.values():
+            class_index.add_source(source.encode())
+    codes: typing.Dict[str, VMCode] = {}
+    errors = []
+    for name, source in sources.items():
+        try:
+            codes[name] = compile_code(source, options._replace(inline=0),
+                                       class_index)
+        except Exception as error:
+            errors.append((name, f"{type(error).__name__}: {error}"))
+    if errors:
+        raise CompileError(errors)
+    link_program(codes.values(), options, gc_functions)
+    return codes
+
+
+def compile_many(sources: typing.Dict[str, str],
+                 options: CompileOptions = CompileOptions(),
+                 whole_program: bool = False,
+                 gc_functions: bool = False) -> typing.Dict[str, str]:
+    """Like compile_many_code, but returns VM text. Nothing touches the
+    filesystem, and compilations share no state, so this may run on several
+    threads at once.
+
+    Args:
+        sources (typing.Dict[str, str]): see compile_many_code.
+        options (CompileOptions): code generation settings.
+        whole_program (bool): see compile_many_code.
+        gc_functions (bool): see compile_many_code.
+
+    Returns:
+        typing.Dict[str, str]: the VM code of every class, by the same
+        names.
+
+    Raises:
+        CompileError: listing every class that failed to compile.
+    """
+    return {name: serialize(code) for name, code in compile_many_code(
+        sources, options, whole_program, gc_functions).items()}
+
+
+def profile_paths(input_paths: typing.List[str], profile_path: str,
+                  options: CompileOptions = CompileOptions(),
+                  class_index: typing.Optional[ClassIndex] = None
+                  ) -> typing.List[typing.Tuple[str, str]]:
+    """Compiles .jack files one after the other in this process, without the
+    cache, and writes where the time went to profile_path. A path ending
+    with .json gets the CompileProfiler report: time per file, phase and
+    subroutine, with the lexer counters of every file. Any other path gets
+    a cProfile dump, which pstats and the usual viewers read.
+
+    Args:
+        input_paths (typing.List[str]): paths of .jack files.
+        profile_path (str): where to write the profile.
+        options (CompileOptions): code generation settings.
+        class_index (typing.Optional[ClassIndex]): see compile_file.
+
+    Returns:
+        typing.List[typing.Tuple[str, str]]: the (path, error message) pairs
+        of the files that failed to compile, as compile_paths.
+    """
+    profiler = CompileProfiler() if profile_path.endswith(".json") else None
+    function_profile = cProfile.Profile() if profiler is None else None
+    errors = []
+    for input_path in input_paths:
+        output = io.StringIO()
+        try:
+            if profiler is not None:
+                with profiler.file(input_path):
+                    code = compile_tokens(JackTokenizer.from_path(input_path),
+                                          output, options, class_index,
+                                          hooks=profiler)
+            else:
+                code = function_profile.runcall(
+                    compile_tokens, JackTokenizer.from_path(input_path),
+                    output, options, class_index)
+        except Exception as error:
+            errors.append((input_path, f"{type(error).__name__}: {error}"))
+            continue
+        output_path = os.path.splitext(input_path)[0] + ".vm"
+        with open(output_path, 'w') as output_file:
+            output_file.write(output.getvalue())
+        if options.binary:
+            write_binary(code, os.path.splitext(input_path)[0] + ".vmb")
+    if profiler is not None:
+        profiler.write(profile_path)
+    else:
+        function_profile.dump_stats(profile_path)
+    return errors
+
+
+_worker_index: typing.Optional[ClassIndex] = None
+
+
+def _set_worker_index(class_index: typing.Optional[ClassIndex]) -> None:
+    global _worker_index
+    _worker_index = class_index
+
+
+def _compile_path_in_worker(input_path: str, cache_dir: typing.Optional[str],
+                            options: CompileOptions) -> str:
+    return compile_path(input_path, cache_dir, options, _worker_index)
+
+
+def string_pool_report(input_path: str,
+                       options: CompileOptions = CompileOptions()) -> str:
+    """Compiles a .jack file in memory with and without string pooling, and
+    compares the size of the VM code and the string allocations. Unpooled,
+    every evaluation of a literal allocates a new string; pooled, each
+    distinct literal allocates once per run of the program.
+
+    Args:
+        input_path (str): path of the .jack file.
+        options (CompileOptions): the other code generation settings.
+
+    Returns:
+        str: a one line summary.
+    """
+    with open(input_path, 'r') as input_file:
+        source = input_file.read()
+    # The code and its size in bytes, unpooled and pooled.
+    builds: typing.List[typing.Tuple[VMCode, int]] = []
+    for pool_strings in (False, True):
+        output = io.StringIO()
+        code = compile_file(io.StringIO(source), output,
+                            options._replace(pool_strings=pool_strings))
+        builds.append((code, len(output.getvalue().encode())))
+    sizes = [size for _, size in builds]
+    # The pooled code defines one function per distinct literal, and calls
+    # it wherever the literal is used.
+    pooled = builds[1][0]
+    names = pooled.names
+    pool_functions = {names[name_id] for opcode, name_id, _ in pooled
+                      if opcode == FUNCTION and ".$string" in names[name_id]}
+    uses = sum(opcode == CALL and names[name_id] in pool_functions
+               for opcode, name_id, _ in pooled)
+    distinct = len(pool_functions)
+    return (f"{os.path.basename(input_path)}: {uses} string literal uses, "
+            f"{distinct} distinct; VM code {sizes[0]:,} -> {sizes[1]:,} bytes "
+            f"({sizes[1] - sizes[0]:+,}); string allocations: one per "
+            f"evaluation -> at most {distinct} per run")
+
+
+def inline_report(inlined: typing.List[typing.Tuple[str, str]]) -> str:
+    """
+    Args:
+        inlined (typing.List[typing.Tuple[str, str]]): what compile_program
+        inlined.
+
+    Returns:
+        str: the number of inlined call sites, then one line per site.
+    """
+    lines = [f"inlined {len(inlined)} call sites"]
+    lines.extend(f"  in {caller}: {callee}" for caller, callee in inlined)
+    return "\n".join(lines)
+
+
+def gc_report(input_paths: typing.List[str],
+              removed: typing.List[typing.Tuple[str, int]]) -> str:
+    """
+    Args:
+        input_paths (typing.List[str]): the compiled .jack files.
+        removed (typing.List[typing.Tuple[str, int]]): what compile_program
+        removed.
+
+    Returns:
+        str: how much code was removed, then every removed subroutine.
+    """
+    subroutine_count = command_count = 0
+    for input_path in input_paths:
+        with open(os.path.splitext(input_path)[0] + ".vm", 'r') as vm_file:
+            for line in vm_file:
+                command_count += 1
+                subroutine_count += line.startswith("function ")
+    removed_commands = sum(size for _, size in removed)
+    lines = [f"removed {len(removed)} of {subroutine_count + len(removed)} "
+             f"subroutines, {removed_commands:,} of "
+             f"{command_count + removed_commands:,} VM commands"]
+    lines.extend(f"  {name} ({size} commands)" for name, size in removed)
+    return "\n".join(lines)
+
+
+def jack_files(argument_path: str) -> typing.List[str]:
+    """Lists the .jack files to compile for a file or directory argument.
+
+    Args:
+        argument_path (str): a .jack file or a directory of them.
+
+    Returns:
+        typing.List[str]: the absolute .jack paths, sorted.
+    """
+    argument_path = os.path.abspath(argument_path)
     if os.path.isdir(argument_path):
         files_to_assemble = [
             os.path.join(argument_path, filename)
             for filename in os.listdir(argument_path)]
     else:
         files_to_assemble = [argument_path]
-    for input_path in files_to_assemble:
-        filename, extension = os.path.splitext(input_path)
-        if extension.lower() != ".jack":
-            continue
-        output_path = filename + ".vm"
-        with open(input_path, 'r') as input_file, \
-                open(output_path, 'w') as output_file:
-            compile_file(input_file, output_file)
+    return sorted(path for path in files_to_assemble
+                  if os.path.splitext(path)[1].lower() == ".jack")
+
+
+def watched_files(root: str) -> typing.Iterator[str]:
+    """Lists the .jack files under a directory and all its subdirectories,
+    skipping hidden ones such as build caches.
+
+    Args:
+        root (str): a directory, or a single .jack file.
+
+    Yields:
+        str: the absolute .jack paths.
+    """
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        yield from jack_files(root)
+        return
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(name for name in subdirectories
+                                   if not name.startswith("."))
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() == ".jack":
+                yield os.path.join(directory, filename)
+
+
+def watch(root: str, cache_dir: typing.Optional[str] = None,
+          options: CompileOptions = CompileOptions(),
+          interval: float = WATCH_INTERVAL, whole_program: bool = False
+          ) -> None:
+    """Compiles every .jack file under root, then keeps polling the tree
+    and recompiles only the files whose content changed, printing how long
+    each one took. Runs until interrupted.
+
+    A file is only read again when its modification time or size changed,
+    and only recompiled when the hash of its content changed as well, so
+    saving a file without changes or touching it costs no compilation.
+
+    Args:
+        root (str): a directory, or a single .jack file.
+        cache_dir (typing.Optional[str]): BuildCache directory, see
+        compile_path.
+        options (CompileOptions): code generation settings.
+        interval (float): seconds between two scans.
+        whole_program (bool): check calls against a ClassIndex of all the
+        watched files. When a change alters any signature, every file is
+        recompiled.
+    """
+    # Last seen (mtime, size) and content hash of every file.
+    stats: typing.Dict[str, typing.Tuple[int, int]] = {}
+    digests: typing.Dict[str, bytes] = {}
+    class_index = None
+    base = root if os.path.isdir(root) else os.path.dirname(root)
+    while True:
+        seen = []
+        changed = []
+        for input_path in watched_files(root):
+            seen.append(input_path)
+            try:
+                status = os.stat(input_path)
+                stat = (status.st_mtime_ns, status.st_size)
+                if stats.get(input_path) == stat:
+                    continue
+                stats[input_path] = stat
+                with open(input_path, 'rb') as input_file:
+                    digest = hashlib.blake2b(input_file.read()).digest()
+            except OSError:
+                # Removed or replaced between listing and reading it.
+                continue
+            if digests.get(input_path) != digest:
+                digests[input_path] = digest
+                changed.append(input_path)
+        for input_path in stats.keys() - set(seen):
+            del stats[input_path]
+            digests.pop(input_path, None)
+        if whole_program and changed:
+            previous_index = class_index
+            try:
+                class_index = ClassIndex.scan(seen)
+            except OSError:
+                # Removed or replaced between listing and scanning it. The
+                # changed files are forgotten, so that the next scan finds
+                # them changed again.
+                for input_path in changed:
+                    del stats[input_path]
+                    del digests[input_path]
+                time.sleep(interval)
+                continue
+            if previous_index is not None and \
+                    previous_index.fingerprint() != class_index.fingerprint():
+                changed = seen
+        for input_path in changed:
+            name = os.path.relpath(input_path, base)
+            start = time.perf_counter()
+            try:
+                compile_path(input_path, cache_dir, options, class_index)
+            except Exception as error:
+                print(f"{name}: {type(error).__name__}: {error}",
+                      file=sys.stderr, flush=True)
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{name}: compiled in {elapsed:.1f} ms", flush=True)
+        time.sleep(interval)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    """Runs the command line interface.
+
+    Args:
+        argv (typing.Optional[typing.List[str]]): the arguments, without the
+        program name. None uses sys.argv.
+
+    Raises:
+        SystemExit: when the arguments are invalid or a file failed to
+        compile.
+    """
+    # Parses the input path and compiles each input file, writing the output
+    # next to it. If the output file does not exist, it is created
+    # automatically in the correct path, using the correct filename.
+    parser = argparse.ArgumentParser(
+        prog="JackCompiler",
+        usage="JackCompiler <input path> [-O] [--pool-strings] [--jobs N] "
+              "[--cache [DIR]] [--pool-report] [--watch] [--whole-program] "
+              "[--gc-functions] [--inline [N]] [--profile FILE] [--precedence] [--binary]")
+    parser.add_argument("input_path", help="a .jack file or a directory")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="compile on N worker processes (0 uses every CPU)")
+    parser.add_argument(
+        "-O", "--optimize", action="store_true",
+        help="run the peephole optimizer over the emitted VM code")
+    parser.add_argument(
+        "--pool-strings", action="store_true",
+        help="build each distinct string literal once per class and reuse it; "
+             "only for programs that never modify or dispose of literals")
+    parser.add_argument(
+        "--pool-report", action="store_true",
+        help="print what --pool-strings saves for every file, then compile "
+             "as usual")
+    parser.add_argument(
+        "--cache", nargs="?", const="", metavar="DIR",
+        help="skip files whose source did not change since they were last "
+             "cached in DIR (default: .jackcache next to the sources)")
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running, and recompile the .jack files under the input "
+             "path, including subdirectories, whenever they change")
+    parser.add_argument(
+        "--whole-program", action="store_true",
+        help="index the signatures of all the given classes first, and check "
+             "that every call names an existing subroutine of the right kind "
+             "with the right number of arguments")
+    parser.add_argument(
+        "--gc-functions", action="store_true",
+        help="leave out every subroutine that Main.main, Sys.init and the OS "
+             "cannot reach, and report what was removed; compiles the whole "
+             "program in this process, without the cache")
+    parser.add_argument(
+        "--inline", nargs="?", type=int, const=INLINE_BUDGET, default=0,
+        metavar="N",
+        help="inline calls to small subroutines without locals, branches "
+             "or calls, whose bodies have at most N VM commands (default "
+             f"{INLINE_BUDGET}), and report the inlined call sites; compiles "
+             "the whole program in this process, without the cache")
+    parser.add_argument(
+        "--profile", metavar="FILE",
+        help="compile in this process, without the cache, and write where "
+             "the time went to FILE: per file, phase and subroutine times "
+             "and lexer counters as JSON if FILE ends with .json, and a "
+             "cProfile dump for pstats otherwise")
+    parser.add_argument(
+        "--precedence", action="store_true",
+        help="give binary operators the conventional precedence, * and / "
+             "before + and -, then < and >, =, & and | last, instead of "
+             "Jack's left to right evaluation")
+    parser.add_argument(
+        "--binary", action="store_true",
+        help="also write every class as a compact binary .vmb file next to "
+             "its .vm file; VMBinary.py disassembles them")
+    args = parser.parse_args(argv)
+    input_paths = jack_files(args.input_path)
+    cache_dir = args.cache
+    if cache_dir == "":
+        source_dir = args.input_path if os.path.isdir(args.input_path) \
+            else os.path.dirname(os.path.abspath(args.input_path))
+        cache_dir = os.path.join(source_dir, ".jackcache")
+    options = CompileOptions(
+        optimize=args.optimize, pool_strings=args.pool_strings,
+        inline=args.inline, precedence=args.precedence, binary=args.binary)
+    if args.watch:
+        # watch compiles one class at a time, through compile_path.
+        ignored = [flag for flag, given in (
+            ("--jobs", args.jobs != 1), ("--gc-functions", args.gc_functions),
+            ("--inline", args.inline != 0), ("--profile", bool(args.profile)),
+            ("--pool-report", args.pool_report)) if given]
+        if ignored:
+            parser.error(f"--watch recompiles one class at a time, and "
+                         f"cannot be combined with {', '.join(ignored)}")
+        try:
+            watch(args.input_path, cache_dir, options,
+                  whole_program=args.whole_program)
+        except KeyboardInterrupt:
+            return
+    if args.pool_report:
+        for input_path in input_paths:
+            print(string_pool_report(input_path, options))
+    class_index = ClassIndex.scan(input_paths) if args.whole_program else None
+    if args.profile:
+        errors = profile_paths(input_paths, args.profile, options, class_index)
+    elif args.gc_functions or args.inline:
+        errors, removed, inlined = compile_program(
+            input_paths, options, class_index, args.gc_functions)
+        if not errors and args.inline:
+            print(inline_report(inlined))
+        if not errors and args.gc_functions:
+            print(gc_report(input_paths, removed))
+    else:
+        errors = compile_paths(input_paths, args.jobs or os.cpu_count(),
+                               cache_dir, options, class_index)
+    for input_path, message in errors:
+        print(f"{input_path}: {message}", file=sys.stderr)
+    if errors:
+        sys.exit(f"{len(errors)} of {len(input_paths)} files failed to compile")
+
+
+if "__main__" == __name__:
+    main()
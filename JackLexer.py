@@ -0,0 +1,324 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import enum
+import functools
+import mmap
+import os
+import re
+import sys
+import typing
+
+
+class TokenKind(str, enum.Enum):
+    """The five kinds of Jack tokens. Members compare equal to their names,
+    so they can be used wherever a token type string is expected.
+    """
+    KEYWORD = "KEYWORD"
+    SYMBOL = "SYMBOL"
+    IDENTIFIER = "IDENTIFIER"
+    INT_CONST = "INT_CONST"
+    STRING_CONST = "STRING_CONST"
+
+
+class Token(typing.NamedTuple):
+    """A classified token. Keyword and symbol values are interned, so equal
+    values are always the same object. The lexer builds these with
+    tuple.__new__ directly, which skips the Python-level constructor.
+    """
+    kind: TokenKind
+    value: str
+    line: int
+    column: int
+
+
+KEYWORDS = frozenset([
+    'class', 'constructor', 'function', 'method', 'field', 'static', 'var',
+    'int', 'char', 'boolean', 'void', 'true', 'false', 'null', 'this', 'let',
+    'do', 'if', 'else', 'while', 'return'])
+
+SYMBOLS = frozenset('{}()[].,;+-*/&|<>=~^#')
+
+_INTERNED = {value: sys.intern(value) for value in KEYWORDS | SYMBOLS}
+
+# One master pattern for the whole Jack lexical grammar. The named groups are
+# tried in order, so comments win over the '/' symbol and an unterminated
+# comment or string is reported instead of being split into symbols.
+_TOKEN_PATTERN = re.compile(r"""
+      (?P<SKIP>\s+|//[^\n]*|/\*.*?\*/)
+    | (?P<STRING_CONST>"[^"\n]*")
+    | (?P<UNTERMINATED>/\*|")
+    | (?P<SYMBOL>[{}()\[\].,;+\-*/&|<>=~^\#])
+    | (?P<INT_CONST>\d+)
+    | (?P<WORD>[^\W\d]\w*)
+    | (?P<UNKNOWN>.)
+""", re.VERBOSE | re.DOTALL)
+
+
+class SourceStats(typing.NamedTuple):
+    """Counters of what the lexer scans in one source, see source_stats."""
+    tokens: int
+    lines: int
+    # Lines without any token: blank lines and lines with only comments.
+    skipped_lines: int
+    comment_bytes: int
+
+
+# Default number of characters tokenize_stream reads at a time.
+CHUNK_SIZE = 1 << 16
+
+
+def tokenize(text: str) -> typing.Iterator[Token]:
+    """Scans a whole Jack source buffer once and yields its tokens.
+
+    Args:
+        text (str): the Jack source code.
+
+    Yields:
+        Token: the classified tokens, with 1-based line and column numbers.
+        String constants are yielded without their enclosing double quotes.
+
+    Raises:
+        ValueError: on an unterminated comment or string, or on a character
+        that cannot start any Jack token.
+    """
+    return _tokenize_chunks((text,))
+
+
+def tokenize_stream(input_stream: typing.TextIO,
+                    chunk_size: int = CHUNK_SIZE) -> typing.Iterator[Token]:
+    """Like tokenize, but reads the source lazily, chunk_size characters at
+    a time, so only about one chunk of it is held in memory at once.
+
+    Args:
+        input_stream (typing.TextIO): the Jack source code.
+        chunk_size (int): number of characters to read at a time.
+    """
+    return _tokenize_chunks(iter(functools.partial(
+        input_stream.read, chunk_size), ""))
+
+
+def _tokenize_chunks(chunks: typing.Iterable[str]) -> typing.Iterator[Token]:
+    """Tokenizes source code that arrives in arbitrary pieces. Each buffer is
+    only scanned up to its last newline: except for block comments, no token
+    spans a newline, so every match before that point is complete. A block
+    comment that is not closed yet is kept, with the rest of the buffer, for
+    the next piece.
+    """
+    interned = _INTERNED
+    new = tuple.__new__
+    keyword_kind, symbol_kind = TokenKind.KEYWORD, TokenKind.SYMBOL
+    identifier_kind, int_kind = TokenKind.IDENTIFIER, TokenKind.INT_CONST
+    line = 1
+    # Offset of the current line in text, negative once it was dropped.
+    line_start = 0
+    text = ""
+    chunks = iter(chunks)
+    at_end = False
+    while not at_end:
+        chunk = next(chunks, None)
+        if chunk is None:
+            at_end = True
+            cut = len(text)
+        else:
+            text += chunk
+            cut = text.rfind("\n") + 1
+        resume = cut
+        for match in _TOKEN_PATTERN.finditer(text, 0, cut):
+            kind = match.lastgroup
+            start = match.start()
+            if kind == "SKIP":
+                # Only whitespace and comments can span lines.
+                end = match.end()
+                newlines = text.count("\n", start, end)
+                if newlines:
+                    line += newlines
+                    line_start = text.rfind("\n", start, end) + 1
+                continue
+            value = match.group()
+            column = start - line_start + 1
+            if kind == "WORD":
+                keyword = interned.get(value)
+                if keyword is None:
+                    yield new(Token, (identifier_kind, value, line, column))
+                else:
+                    yield new(Token, (keyword_kind, keyword, line, column))
+            elif kind == "SYMBOL":
+                yield new(Token, (symbol_kind, interned[value], line, column))
+            elif kind == "INT_CONST":
+                yield new(Token, (int_kind, value, line, column))
+            elif kind == "STRING_CONST":
+                yield new(Token, (TokenKind.STRING_CONST, value[1:-1], line,
+                                  column))
+            elif kind == "UNTERMINATED":
+                if value == "/*" and not at_end:
+                    resume = start
+                    break
+                raise ValueError(f"line {line}: unterminated "
+                                 f"{'comment' if value == '/*' else 'string'}")
+            else:
+                raise ValueError(f"line {line}: unexpected character {value!r}")
+        if resume:
+            text = text[resume:]
+            line_start -= resume
+
+
+def source_stats(text: str) -> SourceStats:
+    """Counts tokens, skipped lines and comments in a Jack source. This is a
+    separate pass, so that the lexers themselves count nothing when nobody
+    asks for it.
+
+    Args:
+        text (str): the Jack source code.
+
+    Returns:
+        SourceStats: the counters of the source.
+    """
+    tokens = comment_bytes = 0
+    token_lines = set()
+    line = 1
+    for match in _TOKEN_PATTERN.finditer(text):
+        if match.lastgroup == "SKIP":
+            value = match.group()
+            if value[0] == "/":
+                comment_bytes += len(value.encode())
+            line += value.count("\n")
+        else:
+            tokens += 1
+            token_lines.add(line)
+    lines = text.count("\n") + (text[-1:] not in ("", "\n"))
+    return SourceStats(tokens, lines, lines - len(token_lines), comment_bytes)
+
+
+# Character classes of the bytes lexer, indexed by the first byte of a match.
+# Bytes 128-255 never get here: non-ASCII sources use the str lexer.
+_SPACE, _SLASH, _QUOTE, _SYMBOL, _DIGIT, _WORD, _OTHER = range(7)
+_BYTE_CLASSES = bytearray([_OTHER]) * 256
+for _byte in b" \t\n\r\f\v\x1c\x1d\x1e\x1f":
+    _BYTE_CLASSES[_byte] = _SPACE
+for _byte in b"{}()[].,;+-*&|<>=~^#":
+    _BYTE_CLASSES[_byte] = _SYMBOL
+for _byte in b"0123456789":
+    _BYTE_CLASSES[_byte] = _DIGIT
+for _byte in b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_":
+    _BYTE_CLASSES[_byte] = _WORD
+_BYTE_CLASSES[ord("/")] = _SLASH
+_BYTE_CLASSES[ord('"')] = _QUOTE
+_BYTE_CLASSES = bytes(_BYTE_CLASSES)
+_STAR = ord("*")
+del _byte
+
+# The interned str of every symbol, indexed by its byte.
+_SYMBOL_VALUES: typing.List[typing.Optional[str]] = [None] * 256
+for _symbol in SYMBOLS:
+    _SYMBOL_VALUES[ord(_symbol)] = _INTERNED[_symbol]
+del _symbol
+
+# The same grammar as _TOKEN_PATTERN, without named groups: the kind of a
+# match is looked up from its first byte instead. Unlike bytes patterns, str
+# patterns also count \x1c-\x1f as whitespace.
+_BYTES_TOKEN_PATTERN = re.compile(rb"""
+      [\s\x1c-\x1f]+ | //[^\n]* | /\*.*?\*/
+    | "[^"\n]*" | /\* | "
+    | [{}()\[\].,;+\-*/&|<>=~^\#]
+    | \d+
+    | [A-Za-z_]\w*
+    | .
+""", re.VERBOSE | re.DOTALL)
+
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+def tokenize_path(path: str) -> typing.Iterator[Token]:
+    """Tokenizes a Jack source file by memory-mapping it and scanning its
+    bytes, which avoids decoding the whole file. Sources that are not ASCII
+    are read with tokenize_stream instead.
+
+    Args:
+        path (str): path of the .jack file.
+
+    Yields:
+        Token: the same tokens tokenize would yield for the file's text.
+
+    Raises:
+        ValueError: on an unterminated comment or string, or on a character
+        that cannot start any Jack token.
+    """
+    with open(path, "rb") as input_file:
+        if os.fstat(input_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if _NON_ASCII.search(data) is None:
+                yield from tokenize_bytes(data)
+                return
+    with open(path, "r") as input_file:
+        yield from tokenize_stream(input_file)
+
+
+def tokenize_bytes(data: typing.Union[bytes, mmap.mmap]
+                   ) -> typing.Iterator[Token]:
+    """Tokenizes ASCII Jack source code given as bytes or a memory map.
+    Matches are classified by their first byte with a 256-entry table.
+    Keywords and symbols map to their interned str directly, and every
+    distinct identifier is decoded only once.
+
+    Args:
+        data (typing.Union[bytes, mmap.mmap]): the ASCII source code.
+
+    Yields:
+        Token: the same tokens tokenize would yield for the decoded text.
+
+    Raises:
+        ValueError: as tokenize.
+    """
+    new = tuple.__new__
+    classes = _BYTE_CLASSES
+    symbol_values = _SYMBOL_VALUES
+    find = data.find
+    keyword_kind, symbol_kind = TokenKind.KEYWORD, TokenKind.SYMBOL
+    identifier_kind, int_kind = TokenKind.IDENTIFIER, TokenKind.INT_CONST
+    string_kind = TokenKind.STRING_CONST
+    # Every word seen so far, mapped to its kind and decoded value.
+    words = {keyword.encode(): (keyword_kind, _INTERNED[keyword])
+             for keyword in KEYWORDS}
+    line = 1
+    line_start = 0
+    for match in _BYTES_TOKEN_PATTERN.finditer(data):
+        start, end = match.span()
+        byte_class = classes[data[start]]
+        if byte_class == _SPACE or (byte_class == _SLASH and end - start > 1):
+            # A complete comment is at least 4 bytes long, so "/*" alone
+            # was not closed.
+            if end - start == 2 and data[start + 1] == _STAR:
+                raise ValueError(f"line {line}: unterminated comment")
+            newline = find(b"\n", start, end)
+            while newline >= 0:
+                line += 1
+                line_start = newline + 1
+                newline = find(b"\n", line_start, end)
+            continue
+        column = start - line_start + 1
+        if byte_class == _WORD:
+            value = match.group()
+            word = words.get(value)
+            if word is None:
+                word = words[value] = (identifier_kind, value.decode("ascii"))
+            yield new(Token, (word[0], word[1], line, column))
+        elif byte_class == _SYMBOL or byte_class == _SLASH:
+            yield new(Token, (symbol_kind, symbol_values[data[start]], line,
+                              column))
+        elif byte_class == _DIGIT:
+            yield new(Token, (int_kind, match.group().decode("ascii"), line,
+                              column))
+        elif byte_class == _QUOTE:
+            if end - start == 1:
+                raise ValueError(f"line {line}: unterminated string")
+            yield new(Token, (string_kind, data[start + 1:end - 1].decode(
+                "ascii"), line, column))
+        else:
+            raise ValueError(f"line {line}: unexpected character "
+                             f"{chr(data[start])!r}")
@@ -5,7 +5,9 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import collections
 import typing
+from JackLexer import CHUNK_SIZE, Token, tokenize_path, tokenize_stream
 
 
 class JackTokenizer:
@@ -92,19 +94,54 @@ class JackTokenizer:
     Note that ^, # correspond to shiftleft and shiftright, respectively.
     """
 
-    def __init__(self, input_stream: typing.TextIO) -> None:
+    def __init__(self, input_stream: typing.TextIO,
+                 chunk_size: int = CHUNK_SIZE) -> None:
         """Opens the input stream and gets ready to tokenize it.
 
         Args:
             input_stream (typing.TextIO): input stream.
+            chunk_size (int): number of characters read from the input
+            stream at a time.
         """
-        # Your code goes here!
-        # A good place to start is to read all the lines of the input:
-        # input_lines = input_stream.read().splitlines()
-        self.input_lines = input_stream.read().splitlines()
-        self.current_row_index = -1
-        self.current_token = ""
-        self.tokens = []
+        # The source is read lazily and scanned once by the master-regex
+        # lexer, which hands out already classified Token records. Tokens
+        # are pulled from it into a small lookahead queue, so memory use
+        # does not grow with the size of the file.
+        self._start(tokenize_stream(input_stream, chunk_size))
+
+    @classmethod
+    def from_path(cls, path: str) -> "JackTokenizer":
+        """Tokenizes a .jack file by memory-mapping it and scanning its bytes,
+        falling back to reading it as text if it is not ASCII.
+
+        Args:
+            path (str): path of the .jack file.
+
+        Returns:
+            JackTokenizer: a tokenizer over the file's tokens.
+        """
+        tokenizer = cls.__new__(cls)
+        tokenizer._start(tokenize_path(path))
+        return tokenizer
+
+    @classmethod
+    def from_tokens(cls, tokens: typing.Iterable[Token]) -> "JackTokenizer":
+        """Serves tokens that were already lexed, e.g. by JackLexer.tokenize.
+
+        Args:
+            tokens (typing.Iterable[Token]): the tokens of one class.
+
+        Returns:
+            JackTokenizer: a tokenizer over those tokens.
+        """
+        tokenizer = cls.__new__(cls)
+        tokenizer._start(iter(tokens))
+        return tokenizer
+
+    def _start(self, tokens: typing.Iterator[Token]) -> None:
+        self._tokens = tokens
+        self._lookahead = collections.deque()
+        self.current: typing.Optional[Token] = None
         self.keywords = ['class', 'constructor', 'function', 'method', 'field',
                          'static', 'var', 'int', 'char', 'boolean', 'void', 'true',
                          'false', 'null', 'this', 'let', 'do', 'if', 'else',
@@ -113,10 +150,7 @@ class JackTokenizer:
                         '-', '*', '/', '&', '|', '<', '>', '=', '~', '^', '#']
         self.keywordConstants = ['true', 'false', 'null', 'this']
         self.unaryOps = ['-', '~', '^', '#']
-        self.ops = ['+', '-', '*', '/', '&', '|', '<', '>', '=', "&lt;", "&gt;", "&amp;"]
-        self.lines_length = len(self.input_lines)
-        self.current_line_tokens = []
-        self._in_block_comment = False
+        self.ops = ['+', '-', '*', '/', '&', '|', '<', '>', '=']
 
     def has_more_tokens(self) -> bool:
         """Do we have more tokens in the input?
@@ -124,135 +158,57 @@ class JackTokenizer:
         Returns:
             bool: True if there are more tokens, False otherwise.
         """
-        return self.current_row_index < self.lines_length
+        return self._fill_lookahead(1)
+
+    def _fill_lookahead(self, count: int) -> bool:
+        """Pulls tokens from the lexer until count of them are queued.
 
-    def delete_current_command(self) -> None:
-        """Deletes the current command."""
-        self.input_lines.pop(self.current_row_index)
-        self.current_row_index = self.current_row_index - 1
-        self.lines_length = self.lines_length - 1
+        Args:
+            count (int): the number of upcoming tokens needed.
+
+        Returns:
+            bool: False if the input ends before count tokens are queued.
+        """
+        lookahead = self._lookahead
+        while len(lookahead) < count:
+            token = next(self._tokens, None)
+            if token is None:
+                return False
+            lookahead.append(token)
+        return True
 
     def advance(self) -> bool:
         """Gets the next token from the input and makes it the current token. 
         This method should be called if has_more_tokens() is true. 
         Initially there is no current token.
+
+        Returns:
+            bool: True.
+
+        Raises:
+            ValueError: if the input has no more tokens, e.g. when it ends in
+            the middle of a statement.
         """
-        if self.current_line_tokens != []:
-            self.current_token = self.current_line_tokens.pop(0)
-            return True
-        self.current_row_index += 1
-        if not self.has_more_tokens():
-            return False
-        self.current_token = self.input_lines[self.current_row_index]
-        if not self.handle_comments_and_blanks():
-            return False
-        self.current_token = self._remove_comments_and_blanks(self.current_token)
-        self.split_line_to_tokens()
-        self.current_token = self.current_line_tokens.pop(0)
+        if not self._lookahead and not self._fill_lookahead(1):
+            line = self.current.line if self.current is not None else 1
+            raise ValueError(f"line {line}: unexpected end of input")
+        self.current = self._lookahead.popleft()
         return True
 
-    def split_line_to_tokens(self) -> None:
-        self.current_line_tokens = []
-        words_until_break = ""
-        index = 0
-        while index < len(self.current_token):
-            char = self.current_token[index]
-            if char in self.symbols:
-                if words_until_break != "":
-                    self.current_line_tokens.append(words_until_break)
-                    words_until_break = ""
-                self.current_line_tokens.append(char)
-            elif char == '"':
-                closing_index = self.current_token.find('"', index + 1)
-                if closing_index == -1:
-                    closing_index = len(self.current_token) - 1
-                string_const = self.current_token[index:closing_index + 1]
-                self.current_line_tokens.append(string_const)
-                index = closing_index
-            elif char.isspace():
-                if words_until_break != "":
-                    self.current_line_tokens.append(words_until_break)
-                    words_until_break = ""
-            else:
-                words_until_break += char
-            index += 1
-        if words_until_break != "":
-            self.current_line_tokens.append(words_until_break)
-        
+    def peek(self, distance: int = 1) -> typing.Optional[Token]:
+        """Looks at an upcoming token without making it the current token.
 
-    # def split_line_to_tokens(self) -> None:
-    #     lst = []
-        
-    #     lst = self.current_token.split()
-    #     word_until_symbol = ""
-    #     for word in lst:
-    #         index = 0
-    #         word_until_symbol = ""
-    #         while (index < len(word)):
-    #             char = word[index]
-    #             if char not in self.symbols:
-    #                 word_until_symbol += char
-    #             else:
-    #                 if word_until_symbol != "":
-    #                     self.current_line_tokens.append(word_until_symbol)
-    #                 word_until_symbol = ""
-    #                 self.current_line_tokens.append(char)
-    #             index += 1
-    #         if word_until_symbol != "":
-    #             self.current_line_tokens.append(word_until_symbol)
-
-    def handle_comment_block(self) -> bool:
-        """Handles multi-line comments in the input."""
-        while not self.current_token.strip().endswith("*/"):
-            self.delete_current_command()
-            self.current_row_index += 1
-            if not self.has_more_tokens():
-                return False
-            self.current_token = self.input_lines[self.current_row_index]
-        return self.has_more_tokens()
-
-    def handle_comments_and_blanks(self) -> bool:
-        """Handles comments and blank lines in the input."""
-        while self.current_token.strip() == "" or self.current_token.strip().startswith("//") or \
-        (self.current_token.strip().startswith("/**")) or \
-            (self.current_token.strip().startswith("/*") and self.current_token.strip().endswith("*/")):
-            if self.current_token.strip().startswith("/**") and not self.current_token.strip().endswith("*/"):
-                if not self.handle_comment_block():
-                    return False
-            self.delete_current_command()
-            self.current_row_index += 1
-            if not self.has_more_tokens():
-                return False
-            self.current_token = self.input_lines[self.current_row_index]
-        return True
+        Args:
+            distance (int): 1 for the token right after the current one, 2 for
+            the one after it, and so on.
 
-    def _remove_comments_and_blanks (self,line: str) -> str:
-        # Ensure this attribute exists in __init__: self._in_block_comment = False
-        in_block_comment = False
-        in_qutos_single = False
-        in_qutos_double = False
-        result = ""
-        i = 0
-        while i < len(line) - 2:
-            if line[i] == "'":
-                result += line[i:line.find("'", i + 1) + 1]
-                i = line.find("'", i + 1) + 1
-            elif line[i] == '"':
-                result += line[i:line.find('"', i + 1) + 1]
-                i = line.find('"', i + 1) + 1
-            elif line[i:i+2] == "//":
-                return result
-            elif line[i:i+2] == "/*" or line[i:i+3] == "/**":
-                closing_index = line.find("*/", i + 2)
-                if closing_index == -1:
-                    return result
-                i = line.find("*/", i + 2) + 2
-            else:
-                result += line[i]
-                i += 1
-        if i < len(line):
-            result += line[i:]
-        return result
+        Returns:
+            typing.Optional[Token]: that token, or None if the input ends
+            before it.
+        """
+        if not self._fill_lookahead(distance):
+            return None
+        return self._lookahead[distance - 1]
 
     def token_type(self) -> str:
         
@@ -261,24 +217,13 @@ class JackTokenizer:
             str: the type of the current token, can be
             "KEYWORD", "SYMBOL", "IDENTIFIER", "INT_CONST", "STRING_CONST"
         """
-        # Your code goes here!
-        if self.current_token in self.keywords:
-            return "KEYWORD"
-        if self.current_token in self.symbols:
-            return "SYMBOL"
-        if self.current_token.isdigit():
-            return "INT_CONST"
-        if self.current_token.startswith('"') and self.current_token.endswith('"'):
-            return "STRING_CONST"
-        if self.isidentifier():
-            return "IDENTIFIER"
-        return "UNKNOWN"
+        return self.current.kind.value
 
     def isidentifier(self) -> bool:
         """
         Checks if the current token is a valid identifier.
         """
-        return (not self.current_token[0].isdigit())
+        return (not self.current.value[0].isdigit())
 
     def keyword(self) -> str:
         """
@@ -289,7 +234,7 @@ class JackTokenizer:
             "BOOLEAN", "CHAR", "VOID", "VAR", "STATIC", "FIELD", "LET", "DO", 
             "IF", "ELSE", "WHILE", "RETURN", "TRUE", "FALSE", "NULL", "THIS"
         """
-        return self.current_token
+        return self.current.value
 
     def symbol(self) -> str:
         """
@@ -306,7 +251,7 @@ class JackTokenizer:
         #     return "&gt;"
         # if self.current_token == "&":
         #     return "&amp;"
-        return self.current_token
+        return self.current.value
 
     def identifier(self) -> str:
         """
@@ -318,7 +263,7 @@ class JackTokenizer:
                   starting with a digit. You can assume keywords cannot be
                   identifiers, so 'self' cannot be an identifier, etc'.
         """
-        return self.current_token
+        return self.current.value
 
     def int_val(self) -> int:
         """
@@ -328,7 +273,7 @@ class JackTokenizer:
             Recall that integerConstant was defined in the grammar like so:
             integerConstant: A decimal number in the range 0-32767.
         """
-        return int(self.current_token)
+        return int(self.current.value)
 
     def string_val(self) -> str:
         """
@@ -339,4 +284,4 @@ class JackTokenizer:
             StringConstant: '"' A sequence of Unicode characters not including 
                       double quote or newline '"'
         """
-        return self.current_token[1:-1]
+        return self.current.value
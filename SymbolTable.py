@@ -8,6 +8,21 @@ Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 import typing
 
 
+class Symbol:
+    """What the symbol table knows about one identifier. Subroutine scope
+    records are reused by later subroutines, so they are only valid until the
+    next call to start_subroutine.
+    """
+    __slots__ = ("type", "kind", "segment", "index")
+
+    def __init__(self, type: str, kind: str, segment: str, index: int) -> None:
+        self.type = type
+        self.kind = kind
+        # The VM segment the identifier lives in, e.g. "local".
+        self.segment = segment
+        self.index = index
+
+
 class SymbolTable:
     """A symbol table that associates names with information needed for Jack
     compilation: type, kind and running index. The symbol table has two nested
@@ -17,8 +32,8 @@ class SymbolTable:
     def __init__(self) -> None:
         """Creates a new empty symbol table."""
         # Your code goes here!
-        self.class_scope = {}
-        self.subroutine_scope = {}
+        self.class_scope: typing.Dict[str, Symbol] = {}
+        self.subroutine_scope: typing.Dict[str, Symbol] = {}
         self.indexes = {
             'STATIC': 0,
             'FIELD': 0,
@@ -31,12 +46,22 @@ class SymbolTable:
             'FIELD': 'this',
             'STATIC': 'static'
         }
+        # Every subroutine scope record allocated so far, in definition
+        # order. The n-th argument or local of a subroutine reuses the n-th
+        # record, so only the largest subroutine allocates.
+        self._records: typing.List[Symbol] = []
+        # The number of records the current subroutine uses. This is not
+        # len(subroutine_scope), which does not grow when a name is defined
+        # again.
+        self._used = 0
+
     def start_subroutine(self) -> None:
         """Starts a new subroutine scope (i.e., resets the subroutine's 
         symbol table).
         """
         # Your code goes here!
-        self.subroutine_scope = {}
+        self.subroutine_scope.clear()
+        self._used = 0
         self.indexes['ARG'] = 0
         self.indexes['VAR'] = 0
 
@@ -52,12 +77,41 @@ class SymbolTable:
             "STATIC", "FIELD", "ARG", "VAR".
         """
         # Your code goes here!
-        if kind in ["STATIC", "FIELD"]:
-            self.class_scope[name] = {'type': type, 'kind': kind, 'index': self.indexes[kind]}
-            self.indexes[kind] += 1
-        elif kind in ["ARG", "VAR"]:
-            self.subroutine_scope[name] = {'type': type, 'kind': kind, 'index': self.indexes[kind]}
-            self.indexes[kind] += 1
+        index = self.indexes[kind]
+        if kind == "ARG" or kind == "VAR":
+            scope = self.subroutine_scope
+            position = self._used
+            self._used = position + 1
+            if position < len(self._records):
+                symbol = self._records[position]
+                symbol.type = type
+                symbol.kind = kind
+                symbol.segment = self.translation[kind]
+                symbol.index = index
+            else:
+                symbol = Symbol(type, kind, self.translation[kind], index)
+                self._records.append(symbol)
+            scope[name] = symbol
+        elif kind == "STATIC" or kind == "FIELD":
+            self.class_scope[name] = Symbol(
+                type, kind, self.translation[kind], index)
+        else:
+            return
+        self.indexes[kind] = index + 1
+
+    def resolve(self, name: str) -> typing.Optional[Symbol]:
+        """Looks an identifier up once, for everything that needs both its
+        segment and its index.
+
+        Args:
+            name (str): name of an identifier.
+
+        Returns:
+            typing.Optional[Symbol]: the named identifier in the current
+            scope, or None if it is unknown in the current scope.
+        """
+        symbol = self.subroutine_scope.get(name)
+        return self.class_scope.get(name) if symbol is None else symbol
 
     def is_var(self, name: str) -> bool:
         """
@@ -90,12 +144,8 @@ class SymbolTable:
             if the identifier is unknown in the current scope.
         """
         # Your code goes here!
-        if name in self.subroutine_scope:
-            return self.translation[self.subroutine_scope[name]['kind']]
-        elif name in self.class_scope:
-            return self.translation[self.class_scope[name]['kind']]
-        else:
-            return None
+        symbol = self.resolve(name)
+        return None if symbol is None else symbol.segment
 
     def type_of(self, name: str) -> str:
         """
@@ -105,7 +155,7 @@ class SymbolTable:
             str: the type of the named identifier in the current scope.
         """
         # Your code goes here!
-        return self.subroutine_scope[name]['type'] if name in self.subroutine_scope else self.class_scope[name]['type']
+        return self._symbol(name).type
 
     def index_of(self, name: str) -> int:
         """
@@ -116,4 +166,10 @@ class SymbolTable:
             int: the index assigned to the named identifier.
         """
         # Your code goes here!
-        return self.subroutine_scope[name]['index'] if name in self.subroutine_scope else self.class_scope[name]['index']
+        return self._symbol(name).index
+
+    def _symbol(self, name: str) -> Symbol:
+        symbol = self.resolve(name)
+        if symbol is None:
+            raise KeyError(name)
+        return symbol
@@ -0,0 +1,154 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+The .vmb format: the VM code of one class as fixed-width binary records, so
+that a reader loads it with one mmap and one copy instead of tokenizing and
+parsing .vm text. All numbers are little-endian.
+
+    offset 0   header, 24 bytes: the magic b"VMB\\0", the format version (u16),
+               2 zero bytes, the instruction count, the name count and the
+               string table size in bytes (u32 each), and 4 zero bytes
+    offset 24  the instructions, 8 bytes (u64) each, packed as VMCode packs
+               them: the opcode in bits 48-55, arg1 in bits 16-47 and arg2
+               in bits 0-15, see VMCode.encode
+    then       the string table: the names that label, goto, if-goto, call
+               and function instructions refer to by index, as UTF-8, each
+               followed by a zero byte
+
+Run this file to disassemble .vmb files back into .vm text:
+
+    python VMBinary.py FILE.vmb ...
+"""
+import argparse
+import array
+import mmap
+import struct
+import sys
+import typing
+from VMCode import VMCode, serialize
+
+MAGIC = b"VMB\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sH2xIII4x")
+_WORD_SIZE = 8
+
+
+def to_bytes(code: VMCode) -> bytes:
+    """
+    Args:
+        code (VMCode): the code of one class.
+
+    Returns:
+        bytes: the code in the .vmb format.
+    """
+    words = code.words
+    if sys.byteorder == "big":
+        words = array.array(words.typecode, words)
+        words.byteswap()
+    strings = "".join(f"{name}\0" for name in code.names).encode()
+    return b"".join([_HEADER.pack(MAGIC, VERSION, len(words), len(code.names),
+                                  len(strings)),
+                     words.tobytes(), strings])
+
+
+def from_bytes(data: typing.Union[bytes, bytearray, memoryview, mmap.mmap]
+               ) -> VMCode:
+    """Reads code in the .vmb format. The instructions are copied out of
+    data at once, so data may be closed afterwards.
+
+    Args:
+        data: the whole .vmb file, as any buffer.
+
+    Returns:
+        VMCode: the code.
+
+    Raises:
+        ValueError: if data is not a complete .vmb file of this version.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("not a .vmb file: too short")
+    magic, version, count, name_count, strings_size = \
+        _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a .vmb file: bad magic number")
+    if version != VERSION:
+        raise ValueError(f"unsupported .vmb version {version}")
+    strings_start = _HEADER.size + count * _WORD_SIZE
+    if len(data) != strings_start + strings_size:
+        raise ValueError(f".vmb file of {len(data)} bytes, expected "
+                         f"{strings_start + strings_size}")
+    words = array.array("Q")
+    with memoryview(data) as view:
+        words.frombytes(view[_HEADER.size:strings_start])
+        strings = bytes(view[strings_start:]).decode()
+    if sys.byteorder == "big":
+        words.byteswap()
+    names = strings.split("\0")[:-1] if strings else []
+    if len(names) != name_count:
+        raise ValueError(f".vmb string table has {len(names)} names, "
+                         f"expected {name_count}")
+    return VMCode.from_words(words, names)
+
+
+def write_binary(code: VMCode, path: str) -> None:
+    """
+    Args:
+        code (VMCode): the code of one class.
+        path (str): the .vmb file to write.
+    """
+    with open(path, 'wb') as output_file:
+        output_file.write(to_bytes(code))
+
+
+def load_binary(path: str) -> VMCode:
+    """Loads a .vmb file through a single read-only mmap.
+
+    Args:
+        path (str): the .vmb file.
+
+    Returns:
+        VMCode: the code.
+
+    Raises:
+        ValueError: if the file is not a .vmb file of this version.
+    """
+    with open(path, 'rb') as input_file:
+        try:
+            mapped = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            raise ValueError("not a .vmb file: too short") from None
+        with mapped:
+            return from_bytes(mapped)
+
+
+def disassemble(path: str) -> str:
+    """
+    Args:
+        path (str): a .vmb file.
+
+    Returns:
+        str: its code as .vm text.
+    """
+    return serialize(load_binary(path))
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="VMBinary", description="disassemble .vmb files to .vm text")
+    parser.add_argument("paths", nargs="+", metavar="FILE",
+                        help="a .vmb file")
+    args = parser.parse_args(argv)
+    for path in args.paths:
+        if len(args.paths) > 1:
+            sys.stdout.write(f"// {path}\n")
+        sys.stdout.write(disassemble(path))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,249 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import typing
+
+# Opcodes. Every arithmetic/logical command has its own opcode, so passes
+# over the code never have to look at strings.
+PUSH, POP, ADD, SUB, NEG, EQ, GT, LT, AND, OR, NOT, SHIFTLEFT, SHIFTRIGHT, \
+    LABEL, GOTO, IF_GOTO, CALL, FUNCTION, RETURN = range(19)
+
+# Segments, used as the first argument of PUSH and POP.
+CONSTANT, ARGUMENT, LOCAL, STATIC, THIS, THAT, POINTER, TEMP = range(8)
+
+SEGMENT_NAMES = ("constant", "argument", "local", "static", "this", "that",
+                 "pointer", "temp")
+SEGMENTS = {name: segment for segment, name in enumerate(SEGMENT_NAMES)}
+
+ARITHMETIC_NAMES = {ADD: "add", SUB: "sub", NEG: "neg", EQ: "eq", GT: "gt",
+                    LT: "lt", AND: "and", OR: "or", NOT: "not",
+                    SHIFTLEFT: "shiftleft", SHIFTRIGHT: "shiftright"}
+ARITHMETIC = {name: opcode for opcode, name in ARITHMETIC_NAMES.items()}
+
+# Opcodes whose first argument is an index into VMCode.names.
+NAMED = frozenset([LABEL, GOTO, IF_GOTO, CALL, FUNCTION])
+
+# An instruction is packed into one 64-bit word: the opcode in bits 48-55,
+# arg1 in bits 16-47 and arg2 in bits 0-15.
+OPCODE_SHIFT = 48
+ARG1_SHIFT = 16
+ARG1_MASK = 0xFFFFFFFF
+ARG2_MASK = 0xFFFF
+
+
+def encode(opcode: int, arg1: int = 0, arg2: int = 0) -> int:
+    """
+    Args:
+        opcode (int): the instruction's opcode.
+        arg1 (int): a segment, a name index, or 0.
+        arg2 (int): an index or a count, or 0.
+
+    Returns:
+        int: the instruction packed into a single word.
+
+    Raises:
+        ValueError: if an argument does not fit in its bits.
+    """
+    _check_args(arg1, arg2)
+    return opcode << OPCODE_SHIFT | arg1 << ARG1_SHIFT | arg2
+
+
+def _check_args(arg1: int, arg2: int) -> None:
+    if not 0 <= arg1 <= ARG1_MASK:
+        raise ValueError(f"argument {arg1} out of range 0..{ARG1_MASK}")
+    if not 0 <= arg2 <= ARG2_MASK:
+        raise ValueError(f"argument {arg2} out of range 0..{ARG2_MASK}")
+
+
+def decode(word: int) -> typing.Tuple[int, int, int]:
+    """
+    Args:
+        word (int): a packed instruction.
+
+    Returns:
+        typing.Tuple[int, int, int]: its (opcode, arg1, arg2) triple.
+    """
+    return (word >> OPCODE_SHIFT, word >> ARG1_SHIFT & ARG1_MASK,
+            word & ARG2_MASK)
+
+
+class VMCode:
+    """An in-memory list of VM instructions. Each (opcode, arg1, arg2)
+    instruction is packed into one word of a typed array, so a whole program
+    costs 8 bytes per instruction. Label and function names are interned in a
+    per-object string table and referred to by index.
+    """
+
+    def __init__(self) -> None:
+        self.words = array.array("Q")
+        self.names: typing.List[str] = []
+        self._name_ids: typing.Dict[str, int] = {}
+
+    @classmethod
+    def from_words(cls, words: array.array, names: typing.List[str]
+                   ) -> "VMCode":
+        """
+        Args:
+            words (array.array): packed instructions, see encode. The array
+            is used as is, not copied.
+            names (typing.List[str]): the string table they refer to.
+
+        Returns:
+            VMCode: the code.
+        """
+        code = cls()
+        code.words = words
+        code.names = names
+        code._name_ids = {name: name_id for name_id, name in enumerate(names)}
+        return code
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __getitem__(self, index: int) -> typing.Tuple[int, int, int]:
+        return decode(self.words[index])
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[int, int, int]]:
+        return map(decode, self.words)
+
+    def name_id(self, name: str) -> int:
+        """
+        Args:
+            name (str): a label or function name.
+
+        Returns:
+            int: the index of the name in the string table, adding it first
+            if it is new.
+        """
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def append(self, opcode: int, arg1: int = 0, arg2: int = 0) -> None:
+        """Appends one instruction.
+
+        Args:
+            opcode (int): the instruction's opcode.
+            arg1 (int): a segment, a name index, or 0.
+            arg2 (int): an index or a count, or 0.
+
+        Raises:
+            ValueError: if an argument does not fit in its bits.
+        """
+        _check_args(arg1, arg2)
+        self.words.append(opcode << OPCODE_SHIFT | arg1 << ARG1_SHIFT | arg2)
+
+    def move_tail(self, start: int, index: int) -> None:
+        """Moves the instructions from start to the end so that they begin at
+        index instead, shifting the ones in between after them.
+
+        Args:
+            start (int): index of the first instruction to move.
+            index (int): where they should begin, at most start.
+        """
+        words = self.words
+        tail = words[start:]
+        del words[start:]
+        words[index:index] = tail
+
+
+_NAMED_TEXT = {LABEL: "label {}\n", GOTO: "goto {}\n", IF_GOTO: "if-goto {}\n",
+               CALL: "call {} {}\n", FUNCTION: "function {} {}\n"}
+
+
+def render(word: int, names: typing.List[str]) -> str:
+    """
+    Args:
+        word (int): a packed instruction.
+        names (typing.List[str]): the string table of its VMCode.
+
+    Returns:
+        str: the instruction as a line of .vm text.
+    """
+    opcode, arg1, arg2 = decode(word)
+    if opcode == PUSH:
+        return f"push {SEGMENT_NAMES[arg1]} {arg2}\n"
+    if opcode == POP:
+        return f"pop {SEGMENT_NAMES[arg1]} {arg2}\n"
+    if opcode in ARITHMETIC_NAMES:
+        return ARITHMETIC_NAMES[opcode] + "\n"
+    if opcode == RETURN:
+        return "return\n"
+    return _NAMED_TEXT[opcode].format(names[arg1], arg2)
+
+
+def serialize(code: VMCode, start: int = 0,
+              end: typing.Optional[int] = None) -> str:
+    """Renders instructions of a VMCode as .vm text. Every distinct
+    instruction is formatted once and reused, which pays off on the long
+    repetitive runs that string literals produce.
+
+    Args:
+        code (VMCode): the code to render.
+        start (int): index of the first instruction to render.
+        end (typing.Optional[int]): index after the last one, or None for the
+        end of the code.
+
+    Returns:
+        str: the VM commands, one per line.
+    """
+    names = code.names
+    rendered: typing.Dict[int, str] = {}
+    lines = []
+    append = lines.append
+    for word in code.words[start:end]:
+        text = rendered.get(word)
+        if text is None:
+            text = rendered[word] = render(word, names)
+        append(text)
+    return "".join(lines)
+
+
+_NAMED_OPCODES = {"label": LABEL, "goto": GOTO, "if-goto": IF_GOTO,
+                  "call": CALL, "function": FUNCTION}
+
+
+def parse(text: str) -> VMCode:
+    """Reads .vm text back into a VMCode, the inverse of serialize. Comments
+    and blank lines are skipped.
+
+    Args:
+        text (str): VM commands, one per line.
+
+    Returns:
+        VMCode: the packed instructions.
+
+    Raises:
+        ValueError: on a line that is not a VM command.
+    """
+    code = VMCode()
+    append = code.append
+    name_id = code.name_id
+    for line_number, line in enumerate(text.splitlines(), 1):
+        fields = line.split("//", 1)[0].split()
+        if not fields:
+            continue
+        command = fields[0]
+        try:
+            if command == "push":
+                append(PUSH, SEGMENTS[fields[1]], int(fields[2]))
+            elif command == "pop":
+                append(POP, SEGMENTS[fields[1]], int(fields[2]))
+            elif command in ARITHMETIC:
+                append(ARITHMETIC[command])
+            elif command == "return":
+                append(RETURN)
+            else:
+                append(_NAMED_OPCODES[command], name_id(fields[1]),
+                       int(fields[2]) if len(fields) > 2 else 0)
+        except (KeyError, IndexError, ValueError):
+            raise ValueError(f"line {line_number}: not a VM command: "
+                             f"{line.strip()}") from None
+    return code
@@ -0,0 +1,162 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import typing
+from VMCode import ARGUMENT, CALL, CONSTANT, FUNCTION, GOTO, IF_GOTO, LABEL, \
+    POINTER, POP, PUSH, RETURN, STATIC, TEMP, THAT, THIS, VMCode, encode
+
+Instruction = typing.Tuple[int, int, int]
+
+# Default size limit, in VM commands, of an inlined subroutine body.
+INLINE_BUDGET = 8
+
+# Arguments of an inlined call are passed in temp 2-7. The compiler itself
+# only uses temp 0 and 1, and an inlined body never calls anything, so these
+# temps are never live across another inlined call.
+_FIRST_ARGUMENT_TEMP = 2
+_MAX_ARGUMENTS = 6
+
+_METHOD_PROLOGUE = [(PUSH, ARGUMENT, 0), (POP, POINTER, 0)]
+_BRANCHES = frozenset([LABEL, GOTO, IF_GOTO, CALL, FUNCTION, RETURN])
+
+
+class Body(typing.NamedTuple):
+    """A subroutine body ready to be inlined."""
+    is_method: bool
+    # The body without its prologue and return, with argument k read from
+    # temp 2+k and this i read from that i.
+    instructions: typing.List[Instruction]
+    # The number of arguments it reads, including this for methods.
+    min_arguments: int
+    # Static variables belong to a file, so such a body is only inlined into
+    # its own class.
+    uses_statics: bool
+
+
+def inline_calls(code: VMCode, bodies: typing.Dict[str, Body]
+                 ) -> typing.List[typing.Tuple[str, str]]:
+    """Replaces calls to the given subroutines with their bodies, in place.
+
+    At the call site, the arguments are popped into temp 2 onwards, except a
+    method's object, which goes to pointer 1 so that the body's fields are
+    read through that. Nothing keeps a value in THAT across a call, so this
+    never disturbs the caller.
+
+    Args:
+        code (VMCode): the code of one class.
+        bodies (typing.Dict[str, Body]): the inlinable subroutines, by full
+        name, see inlinable_bodies.
+
+    Returns:
+        typing.List[typing.Tuple[str, str]]: the caller and the callee of
+        every inlined call site, in order.
+    """
+    names = code.names
+    if not any(name in bodies for name in names):
+        return []
+    out: typing.List[Instruction] = []
+    sites = []
+    caller = ""
+    for instruction in code:
+        opcode, name_id, arg_count = instruction
+        if opcode == FUNCTION:
+            caller = names[name_id]
+        elif opcode == CALL and names[name_id] in bodies:
+            callee = names[name_id]
+            body = bodies[callee]
+            if body.min_arguments <= arg_count <= _MAX_ARGUMENTS and (
+                    not body.uses_statics or
+                    _class_of(callee) == _class_of(caller)):
+                out.extend(_argument_pops(arg_count, body.is_method))
+                out.extend(body.instructions)
+                sites.append((caller, callee))
+                continue
+        out.append(instruction)
+    if sites:
+        code.words[:] = array.array(
+            code.words.typecode, [encode(*instruction) for instruction in out])
+    return sites
+
+
+def _class_of(name: str) -> str:
+    return name.partition(".")[0]
+
+
+def _argument_pops(arg_count: int, is_method: bool) -> typing.List[Instruction]:
+    pops = [(POP, TEMP, _FIRST_ARGUMENT_TEMP + index)
+            for index in reversed(range(arg_count))]
+    if is_method:
+        pops[-1] = (POP, POINTER, 1)
+    return pops
+
+
+def inlinable_bodies(code: VMCode, budget: int = INLINE_BUDGET
+                     ) -> typing.Dict[str, Body]:
+    """Finds the subroutines of a class that can be inlined: those with no
+    locals, no branches and no calls, that end with their only return, and
+    whose body is at most budget commands long. Not calling anything also
+    makes them non-recursive.
+
+    Args:
+        code (VMCode): the code of one class.
+        budget (int): the largest body, in VM commands, that is inlined.
+
+    Returns:
+        typing.Dict[str, Body]: the inlinable subroutines, by full name.
+    """
+    instructions = list(code)
+    bodies = {}
+    starts = [index for index, instruction in enumerate(instructions)
+              if instruction[0] == FUNCTION]
+    for position, start in enumerate(starts):
+        end = starts[position + 1] if position + 1 < len(starts) \
+            else len(instructions)
+        name_id, local_count = instructions[start][1:]
+        body = instructions[start + 1:end]
+        if local_count or not body or body[-1][0] != RETURN:
+            continue
+        is_method = body[:2] == _METHOD_PROLOGUE
+        body = body[2 if is_method else 0:-1]
+        if len(body) > budget:
+            continue
+        rewritten = _rewrite_body(body, is_method)
+        if rewritten is not None:
+            bodies[code.names[name_id]] = rewritten
+    return bodies
+
+
+def _rewrite_body(body: typing.List[Instruction],
+                  is_method: bool) -> typing.Optional[Body]:
+    """Moves a body's argument and field accesses to the inlined locations.
+
+    Returns:
+        typing.Optional[Body]: the rewritten body, or None if it uses
+        anything that cannot be inlined.
+    """
+    rewritten = []
+    min_arguments = 1 if is_method else 0
+    uses_statics = False
+    for opcode, segment, index in body:
+        if opcode in _BRANCHES:
+            return None
+        if opcode == PUSH or opcode == POP:
+            if segment == ARGUMENT:
+                if is_method and index == 0:
+                    return None
+                min_arguments = max(min_arguments, index + 1)
+                segment, index = TEMP, _FIRST_ARGUMENT_TEMP + index
+            elif segment == THIS and is_method:
+                segment = THAT
+            elif segment == STATIC:
+                uses_statics = True
+            elif segment != CONSTANT:
+                return None
+        rewritten.append((opcode, segment, index))
+    if min_arguments > _MAX_ARGUMENTS:
+        return None
+    return Body(is_method, rewritten, min_arguments, uses_statics)
@@ -0,0 +1,227 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import typing
+from VMCode import ADD, AND, CONSTANT, EQ, FUNCTION, GOTO, GT, IF_GOTO, \
+    LABEL, LT, NEG, NOT, OR, POINTER, POP, PUSH, RETURN, SHIFTLEFT, \
+    SHIFTRIGHT, SUB, TEMP, THAT, VMCode, encode
+
+Instruction = typing.Tuple[int, int, int]
+
+_UNARY_OPCODES = frozenset([NEG, NOT, SHIFTLEFT, SHIFTRIGHT])
+# Unary and binary operations that can be evaluated at compile time. A Hack
+# shiftright may or may not keep the sign bit, so it is never evaluated.
+_UNARY = {NEG: lambda x: -x, NOT: lambda x: ~x, SHIFTLEFT: lambda x: x << 1}
+_BINARY = {
+    ADD: lambda x, y: x + y,
+    SUB: lambda x, y: x - y,
+    AND: lambda x, y: x & y,
+    OR: lambda x, y: x | y,
+    EQ: lambda x, y: -1 if x == y else 0,
+    GT: lambda x, y: -1 if x > y else 0,
+    LT: lambda x, y: -1 if x < y else 0,
+}
+# Operations whose result is always true (-1) or false (0), so that "not"
+# negates it as a condition too. On other values, the bitwise not of a true
+# value may also be true.
+_COMPARISONS = frozenset([EQ, GT, LT])
+# Longest value computation moved by the array store rewrite.
+_MAX_MOVED_RUN = 32
+
+
+def to_int16(value: int) -> int:
+    """
+    Args:
+        value (int): any integer.
+
+    Returns:
+        int: the value wrapped to a signed 16-bit Hack word.
+    """
+    return (value + 0x8000) % 0x10000 - 0x8000
+
+
+def constant_code(value: int) -> typing.List[Instruction]:
+    """
+    Args:
+        value (int): a signed 16-bit value.
+
+    Returns:
+        typing.List[Instruction]: the shortest code pushing that value, since
+        "push constant" only takes 0..32767.
+    """
+    if value >= 0:
+        return [(PUSH, CONSTANT, value)]
+    if value == -0x8000:
+        return [(PUSH, CONSTANT, 0x7FFF), (NOT, 0, 0)]
+    return [(PUSH, CONSTANT, -value), (NEG, 0, 0)]
+
+
+def optimize_code(code: VMCode) -> int:
+    """Runs the peephole passes over the code until nothing changes, and
+    rewrites it in place.
+
+    Args:
+        code (VMCode): the code of one class.
+
+    Returns:
+        int: the number of instructions removed.
+    """
+    instructions = list(code)
+    before = len(instructions)
+    while True:
+        optimized = _simplify_jumps(_fold_sequences(instructions))
+        if optimized == instructions:
+            break
+        instructions = optimized
+    code.words[:] = array.array(
+        code.words.typecode,
+        [encode(*instruction) for instruction in instructions])
+    return before - len(instructions)
+
+
+def _constant_tail(out: typing.List[Instruction],
+                   end: int) -> typing.Optional[typing.Tuple[int, int]]:
+    """Looks for a constant computation ending right before out[end]: a
+    "push constant" followed by any number of neg/not/shiftleft.
+
+    Returns:
+        typing.Optional[typing.Tuple[int, int]]: the constant's value and the
+        index where its code starts, or None.
+    """
+    start = end - 1
+    while start >= 0 and out[start][0] in _UNARY:
+        start -= 1
+    if start < 0 or out[start][0] != PUSH or out[start][1] != CONSTANT:
+        return None
+    value = out[start][2]
+    for opcode, _, _ in out[start + 1:end]:
+        value = to_int16(_UNARY[opcode](value))
+    return value, start
+
+
+def _value_run_start(out: typing.List[Instruction], end: int) -> int:
+    """Finds the start of the code right before out[end] that pushes exactly
+    one value, using only pushes that do not read THAT and arithmetic.
+
+    Returns:
+        int: the start index of that code, or -1 if there is none.
+    """
+    depth = 0
+    for index in range(end - 1, max(end - _MAX_MOVED_RUN, 0) - 1, -1):
+        opcode, segment, position = out[index]
+        if opcode == PUSH:
+            if segment == THAT or (segment == POINTER and position == 1):
+                return -1
+            depth += 1
+        elif opcode in _BINARY:
+            depth -= 1
+        elif opcode not in _UNARY_OPCODES:
+            return -1
+        if depth == 1:
+            return index
+    return -1
+
+
+def _fold_sequences(instructions: typing.List[Instruction]
+                    ) -> typing.List[Instruction]:
+    """Rewrites short instruction sequences as they are appended:
+
+    - constant computations are evaluated with 16-bit wrap-around;
+    - "not; not" and "neg; neg" cancel out;
+    - "eq; not; if-goto" becomes "sub; if-goto";
+    - a branch on a constant becomes a goto or disappears;
+    - "push x; pop x" is dropped;
+    - the "pop temp 0 / pop pointer 1 / push temp 0 / pop that 0" array
+      store is reordered to "pop pointer 1 / <value> / pop that 0" when the
+      value is computed without touching THAT.
+    """
+    out: typing.List[Instruction] = []
+    for instruction in instructions:
+        opcode = instruction[0]
+        if opcode in _UNARY:
+            constant = _constant_tail(out, len(out))
+            if constant is not None:
+                value, start = constant
+                del out[start:]
+                out.extend(constant_code(to_int16(_UNARY[opcode](value))))
+                continue
+            if opcode != SHIFTLEFT and out and out[-1][0] == opcode:
+                out.pop()
+                continue
+        elif opcode in _BINARY:
+            right = _constant_tail(out, len(out))
+            left = right and _constant_tail(out, right[1])
+            if left:
+                del out[left[1]:]
+                out.extend(constant_code(
+                    to_int16(_BINARY[opcode](left[0], right[0]))))
+                continue
+        elif opcode == IF_GOTO:
+            constant = _constant_tail(out, len(out))
+            if constant is not None:
+                del out[constant[1]:]
+                if constant[0] != 0:
+                    out.append((GOTO, instruction[1], 0))
+                continue
+            if len(out) >= 2 and out[-1][0] == NOT and out[-2][0] == EQ:
+                out[-2:] = [(SUB, 0, 0)]
+        elif opcode == POP:
+            if out and out[-1] == (PUSH,) + instruction[1:] and \
+                    instruction[1] != CONSTANT:
+                out.pop()
+                continue
+            if instruction == (POP, THAT, 0) and len(out) >= 4 and \
+                    out[-3:] == [(POP, TEMP, 0), (POP, POINTER, 1),
+                                 (PUSH, TEMP, 0)]:
+                start = _value_run_start(out, len(out) - 3)
+                if start >= 0:
+                    out[start:] = [(POP, POINTER, 1)] + out[start:-3]
+        out.append(instruction)
+    return out
+
+
+def _simplify_jumps(instructions: typing.List[Instruction]
+                    ) -> typing.List[Instruction]:
+    """Cleans up control flow:
+
+    - "<comparison>; not; if-goto A; goto B; label A" becomes
+      "<comparison>; if-goto B; label A";
+    - code after a goto or return is dropped until the next label;
+    - a goto to a label that directly follows it is dropped;
+    - labels that nothing jumps to are dropped.
+    """
+    out: typing.List[Instruction] = []
+    reachable = True
+    for index, instruction in enumerate(instructions):
+        opcode = instruction[0]
+        if opcode == LABEL or opcode == FUNCTION:
+            reachable = True
+        elif not reachable:
+            continue
+        if opcode == GOTO:
+            if len(out) >= 3 and out[-1][0] == IF_GOTO and out[-2][0] == NOT \
+                    and out[-3][0] in _COMPARISONS \
+                    and instructions[index + 1:index + 2] == [
+                        (LABEL, out[-1][1], 0)]:
+                out[-2:] = [(IF_GOTO, instruction[1], 0)]
+                continue
+            following = index + 1
+            while following < len(instructions) and \
+                    instructions[following][0] == LABEL and \
+                    instructions[following][1] != instruction[1]:
+                following += 1
+            if following < len(instructions) and \
+                    instructions[following] == (LABEL, instruction[1], 0):
+                continue
+        out.append(instruction)
+        if opcode == GOTO or opcode == RETURN:
+            reachable = False
+    targets = {arg1 for opcode, arg1, _ in out
+               if opcode == GOTO or opcode == IF_GOTO}
+    return [instruction for instruction in out
+            if instruction[0] != LABEL or instruction[1] in targets]
@@ -5,20 +5,63 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import functools
 import typing
+from VMCode import ARG1_SHIFT, ARG2_MASK, ARITHMETIC, CALL, FUNCTION, GOTO, IF_GOTO, \
+    LABEL, POP, PUSH, RETURN, SEGMENTS, VMCode, encode, serialize
+
+# Pre-packed instruction words, so recording a command is a single OR.
+_PUSH_WORDS = {name: encode(PUSH, segment) for name, segment in SEGMENTS.items()}
+_POP_WORDS = {name: encode(POP, segment) for name, segment in SEGMENTS.items()}
+_ARITHMETIC_WORDS = {name: encode(opcode) for name, opcode in ARITHMETIC.items()}
+_RETURN_WORD = encode(RETURN)
+_CALL_WORD = encode(CALL)
 
 
 class VMWriter:
     """
     Writes VM commands into a file. Encapsulates the VM command syntax.
+    Commands are recorded as instructions in a VMCode object (self.code),
+    which later passes can inspect or rewrite, and are rendered as text only
+    when they are flushed to the output stream.
     """
 
-    def __init__(self, output_stream: typing.TextIO) -> None:
-        """Creates a new file and prepares it for writing VM commands."""
-        # Your code goes here!
-        # Note that you can write to output_stream like so:
-        # output_stream.write("Hello world! \n")
+    def __init__(self, output_stream: typing.Optional[typing.TextIO],
+                 buffer_size: typing.Optional[int] = None) -> None:
+        """Creates a new file and prepares it for writing VM commands.
+
+        Args:
+            output_stream (typing.Optional[typing.TextIO]): where the VM code
+            is written, or None to only record it in self.code.
+            buffer_size (typing.Optional[int]): commands are written with a
+            single write() call per flush. None writes them when flush() is
+            called (once per class), a positive number also flushes whenever
+            that many commands are pending, and 0 writes every command as
+            soon as it is emitted.
+        """
         self.output_stream = output_stream
+        self.code = VMCode()
+        self._flushed = 0
+        self._flush_at = max(buffer_size or 0, 1)
+        # Without a size limit nothing has to be checked per command, so
+        # recording is just an append to the instruction array.
+        self._record = self.code.words.append if buffer_size is None \
+            else self._record_and_flush
+
+    def _record_and_flush(self, word: int) -> None:
+        words = self.code.words
+        words.append(word)
+        if len(words) - self._flushed >= self._flush_at:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all commands recorded since the last flush to the output
+        stream.
+        """
+        end = len(self.code)
+        if self.output_stream is not None and end > self._flushed:
+            self.output_stream.write(serialize(self.code, self._flushed, end))
+        self._flushed = end
 
     def write_push(self, segment: str, index: int) -> None:
         """Writes a VM push command.
@@ -29,7 +72,9 @@ class VMWriter:
             index (int): the index to push to.
         """
         # Your code goes here!
-        self.output_stream.write(f"push {segment} {index}\n")
+        if not 0 <= index <= ARG2_MASK:
+            raise ValueError(f"push {segment} {index}: index out of range")
+        self._record(_PUSH_WORDS[segment] | index)
 
     def write_pop(self, segment: str, index: int) -> None:
         """Writes a VM pop command.
@@ -39,7 +84,9 @@ class VMWriter:
             "LOCAL", "STATIC", "THIS", "THAT", "POINTER", "TEMP".
             index (int): the index to pop from.
         """
-        self.output_stream.write(f"pop {segment} {index}\n")
+        if not 0 <= index <= ARG2_MASK:
+            raise ValueError(f"pop {segment} {index}: index out of range")
+        self._record(_POP_WORDS[segment] | index)
         
 
     def write_arithmetic(self, command: str) -> None:
@@ -49,7 +96,21 @@ class VMWriter:
             command (str): the command to write, can be "ADD", "SUB", "NEG", 
             "EQ", "GT", "LT", "AND", "OR", "NOT", "SHIFTLEFT", "SHIFTRIGHT".
         """
-        self.output_stream.write(f"{command.lower()}\n")
+        self._record(_ARITHMETIC_WORDS[command.lower()])
+
+    def arithmetic_writer(self, command: str) -> typing.Callable[[], None]:
+        """Returns a function that writes one arithmetic command. Its
+        instruction word is looked up once, for callers that dispatch to a
+        fixed set of commands.
+
+        Args:
+            command (str): the command, as for write_arithmetic.
+
+        Returns:
+            typing.Callable[[], None]: writes the command when called.
+        """
+        return functools.partial(self._record,
+                                 _ARITHMETIC_WORDS[command.lower()])
 
     def write_label(self, label: str) -> None:
         """Writes a VM label command.
@@ -57,7 +118,7 @@ class VMWriter:
         Args:
             label (str): the label to write.
         """
-        self.output_stream.write(f"label {label}\n")
+        self._record(encode(LABEL, self.code.name_id(label)))
 
     def write_goto(self, label: str) -> None:
         """Writes a VM goto command.
@@ -65,7 +126,7 @@ class VMWriter:
         Args:
             label (str): the label to go to.
         """
-        self.output_stream.write(f"goto {label}\n")
+        self._record(encode(GOTO, self.code.name_id(label)))
 
     def write_if(self, label: str) -> None:
         """Writes a VM if-goto command.
@@ -73,7 +134,7 @@ class VMWriter:
         Args:
             label (str): the label to go to.
         """
-        self.output_stream.write(f"if-goto {label}\n")
+        self._record(encode(IF_GOTO, self.code.name_id(label)))
 
     def write_call(self, name: str, n_args: int) -> None:
         """Writes a VM call command.
@@ -83,7 +144,10 @@ class VMWriter:
             n_args (int): the number of arguments the function receives.
         """
         # Your code goes here!
-        self.output_stream.write(f"call {name} {n_args}\n")
+        if not 0 <= n_args <= ARG2_MASK:
+            raise ValueError(f"call {name} {n_args}: argument count out of "
+                             f"range")
+        self._record(_CALL_WORD | self.code.name_id(name) << ARG1_SHIFT | n_args)
 
     def write_function(self, name: str, n_locals: int) -> None:
         """Writes a VM function command.
@@ -93,9 +157,9 @@ class VMWriter:
             n_locals (int): the number of local variables the function uses.
         """
         # Your code goes here!
-        self.output_stream.write(f"function {name} {n_locals}\n")
+        self._record(encode(FUNCTION, self.code.name_id(name), n_locals))
 
     def write_return(self) -> None:
         """Writes a VM return command."""
         # Your code goes here!
-        self.output_stream.write(f"return\n")
+        self._record(_RETURN_WORD)
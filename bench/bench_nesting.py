@@ -0,0 +1,106 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Compares the explicit-stack expression parser of CompilationEngine with the
+recursive one it replaced, as it was at an earlier git revision, on single
+expressions nested ever deeper:
+parentheses, unary chains, calls and array indexes. Reports the compile time
+per nesting level, and the depths at which the recursive parser runs out of
+Python stack. Only parsing and code generation are timed, on already lexed
+tokens.
+
+Usage: python bench/bench_nesting.py [--depths D ...] [--repeat R]
+                                     [--revision REV]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import types
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import CompilationEngine
+import JackLexer
+import JackTokenizer
+from git_revision import EXPLICIT_STACKS, import_revision, \
+    revision_before
+
+# The modules an engine compiles with, by name: CompilationEngine, JackLexer
+# and JackTokenizer. Every engine has to read tokens of its own lexer, whose
+# TokenKind it compares against.
+Engine = typing.Dict[str, types.ModuleType]
+
+# Every form of nesting, as a function of the depth returning an expression.
+FORMS: typing.Dict[str, typing.Callable[[int], str]] = {
+    "parentheses": lambda depth: "(" * depth + "a" + " + b)" * depth,
+    "unary": lambda depth: "-~" * (depth // 2) + "-" * (depth % 2) + "a",
+    "calls": lambda depth: "Math.abs(" * depth + "a" + ")" * depth,
+    "indexes": lambda depth: "x[" * depth + "a" + "]" * depth,
+}
+
+
+def nested_class(expression: str) -> str:
+    return ("class Nested {\n    function int run(int a, int b) {\n"
+            f"        var Array x;\n        return {expression};\n    }}\n}}\n")
+
+
+def engines(revision: str) -> typing.List[typing.Tuple[str, Engine]]:
+    current = {"CompilationEngine": CompilationEngine, "JackLexer": JackLexer,
+               "JackTokenizer": JackTokenizer}
+    return [("recursive", import_revision(revision, current)),
+            ("explicit stack", current)]
+
+
+def best_time(engine: Engine, source: str,
+              repeat: int) -> typing.Optional[float]:
+    """Returns the best wall time of compiling the already lexed source, or
+    None if the engine ran out of Python stack."""
+    tokens = list(engine["JackLexer"].tokenize(source))
+    engine_class = engine["CompilationEngine"].CompilationEngine
+    from_tokens = engine["JackTokenizer"].JackTokenizer.from_tokens
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            engine_class(from_tokens(tokens), io.StringIO())
+        except RecursionError:
+            return None
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="expression nesting "
+                                                 "benchmark")
+    parser.add_argument("--depths", type=int, nargs="+",
+                        default=[10, 100, 200, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--revision",
+                        help="the git revision of the engine to compare "
+                             "against (default: the last one with the "
+                             "recursive parser)")
+    args = parser.parse_args()
+
+    all_engines = engines(args.revision or revision_before(EXPLICIT_STACKS))
+    print(f"recursion limit: {sys.getrecursionlimit()}")
+    for form, expression in FORMS.items():
+        print(f"{form}:")
+        for depth in args.depths:
+            source = nested_class(expression(depth))
+            results = []
+            for label, engine in all_engines:
+                seconds = best_time(engine, source, args.repeat)
+                results.append(f"{label} " + (
+                    "RecursionError" if seconds is None
+                    else f"{seconds / depth * 1e6:6.2f} us/level"))
+            print(f"  depth {depth:>6,}: " + ", ".join(results))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,160 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Compares the table-driven CompilationEngine with the engine that dispatched
+statements and operators through if/elif chains and list lookups, as it was
+at an earlier git revision.
+
+The gain of the tables is measured by the cost of the dispatch alone, per
+binary operator. The whole parse of expression- and statement-heavy
+generated code is also timed, for context only. Every engine reads the source
+already lexed, and the runs of the engines alternate, so that all see the
+same machine load. Still, the whole parse includes everything else that
+changed in the engine since that revision, and the tokenizer of each
+revision, which takes most of the time. It varies by shape and from run to
+run around even, so it is reported as the ratio of the old time to the new
+one, not as a gain of the tables. The outputs are compared with branch
+labels renamed in order of appearance, as labels are now scoped to their
+subroutine.
+
+Usage: python bench/bench_parser.py [--shapes S ...] [--repeat R]
+                                    [--revision REV]
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import time
+import timeit
+import types
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import CompilationEngine
+import JackLexer
+import JackTokenizer
+from git_revision import DISPATCH_TABLES, import_revision, \
+    revision_before
+from jack_programs import SHAPES
+
+# The modules an engine compiles with, by name: CompilationEngine, JackLexer
+# and JackTokenizer. Every engine has to read tokens of its own lexer, whose
+# TokenKind it compares against.
+Engine = typing.Dict[str, types.ModuleType]
+
+_LABEL = re.compile(r"^((?:label|goto|if-goto) )(\S+)$", re.MULTILINE)
+
+
+def engines(revision: str) -> typing.List[typing.Tuple[str, Engine]]:
+    current = {"CompilationEngine": CompilationEngine, "JackLexer": JackLexer,
+               "JackTokenizer": JackTokenizer}
+    return [("if/elif chains", import_revision(revision, current)),
+            ("dispatch tables", current)]
+
+
+def compile_tokens(engine: Engine, tokens: typing.List[typing.Any],
+                   optimize: bool) -> str:
+    output = io.StringIO()
+    engine["CompilationEngine"].CompilationEngine(
+        engine["JackTokenizer"].JackTokenizer.from_tokens(tokens), output,
+        optimize=optimize)
+    return output.getvalue()
+
+
+def normalize_labels(code: str) -> str:
+    """Renames the branch labels of VM code to L0, L1, ... in order of first
+    appearance."""
+    names: typing.Dict[str, str] = {}
+    return _LABEL.sub(lambda match: match.group(1) + names.setdefault(
+        match.group(2), f"L{len(names)}"), code)
+
+
+def best_times(engine_tokens: typing.List[typing.Tuple[Engine, list]],
+               optimize: bool, repeat: int) -> typing.List[float]:
+    """Returns the best wall time of every engine, alternating between
+    them."""
+    best = [float("inf")] * len(engine_tokens)
+    for _ in range(repeat):
+        for position, (engine, tokens) in enumerate(engine_tokens):
+            start = time.perf_counter()
+            compile_tokens(engine, tokens, optimize)
+            best[position] = min(best[position], time.perf_counter() - start)
+    return best
+
+
+def dispatch_times(all_engines: typing.List[typing.Tuple[str, Engine]],
+                   number: int) -> typing.List[float]:
+    """Returns the time every engine takes to test whether a symbol is a
+    binary operator and emit it, averaged over every operator, in
+    nanoseconds."""
+    times = []
+    for _, modules in all_engines:
+        tokens = list(modules["JackLexer"].tokenize("class Empty { }"))
+        engine = modules["CompilationEngine"].CompilationEngine(
+            modules["JackTokenizer"].JackTokenizer.from_tokens(tokens), None)
+        if not hasattr(engine, "_binary_ops"):
+            ops = engine.input_stream.ops
+            def emit(op: str, ops=ops, handle_op=engine.handle_op) -> None:
+                if op in ops:
+                    handle_op(op)
+        else:
+            def emit(op: str, ops=engine._binary_ops) -> None:
+                if op in ops:
+                    ops[op]()
+        operators = list("+-*/&|<>=")
+        seconds = min(timeit.repeat(lambda: [emit(op) for op in operators],
+                                    number=number, repeat=5))
+        times.append(seconds / number / len(operators) * 1e9)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="parser micro-benchmark")
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES),
+                        default=["wide_expressions", "deep_expressions",
+                                 "long_chains"])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="fold constants while parsing")
+    parser.add_argument("--revision",
+                        help="the git revision of the engine to compare "
+                             "against (default: the last one with if/elif "
+                             "chains)")
+    args = parser.parse_args()
+
+    all_engines = engines(args.revision or revision_before(DISPATCH_TABLES))
+    print("whole parse, for context:")
+    for shape in args.shapes:
+        generate, size = SHAPES[shape]
+        sources = list(generate(size).values())
+        if len(sources) != 1:
+            sys.exit(f"{shape} has more than one class")
+        engine_tokens = [
+            (engine, list(engine["JackLexer"].tokenize(sources[0])))
+            for _, engine in all_engines]
+        outputs = {normalize_labels(compile_tokens(engine, tokens,
+                                                   args.optimize))
+                   for engine, tokens in engine_tokens}
+        if len(outputs) != 1:
+            sys.exit(f"the engines compile {shape} differently")
+        token_count = len(engine_tokens[-1][1])
+        print(f"  {shape}: {token_count:,} tokens")
+        times = best_times(engine_tokens, args.optimize, args.repeat)
+        for (label, _), seconds in zip(all_engines, times):
+            print(f"    {label:>15}: {seconds * 1000:8.1f} ms "
+                  f"{token_count / seconds:12,.0f} tokens/s")
+        print(f"    {'old/new time':>15}: {times[0] / times[1]:8.2f}")
+    print("binary operator dispatch:")
+    nanoseconds = dispatch_times(all_engines, 20000)
+    for (label, _), operator_nanoseconds in zip(all_engines, nanoseconds):
+        print(f"  {label:>15}: {operator_nanoseconds:8.0f} ns per operator")
+    print(f"  {'speedup':>15}: {nanoseconds[0] / nanoseconds[1]:8.2f}x")
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,71 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Shows how tokenizing time grows with file size and comment density. The
+time per line of the queue-based JackTokenizer should stay flat, while the
+old tokenizer (which deleted every blank or comment line from its line list)
+gets slower per line as files grow. The old tokenizer is imported as it was
+at an earlier git revision.
+
+Usage: python bench/bench_scaling.py [--lines N ...] [--densities D ...]
+                                     [--revision REV | --no-legacy]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from JackTokenizer import JackTokenizer
+from git_revision import MASTER_REGEX_LEXER, import_revision, \
+    revision_before
+from jack_programs import generate_lines
+
+
+def time_tokenizer(tokenizer_class: type, source: str) -> float:
+    """Returns the wall time of tokenizing the whole source, in seconds."""
+    start = time.perf_counter()
+    tokenizer = tokenizer_class(io.StringIO(source))
+    while tokenizer.has_more_tokens() and tokenizer.advance():
+        tokenizer.token_type()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="tokenizer scaling benchmark")
+    parser.add_argument("--lines", type=int, nargs="+",
+                        default=[5000, 10000, 20000, 40000])
+    parser.add_argument("--densities", type=float, nargs="+",
+                        default=[0.0, 0.5, 0.9])
+    parser.add_argument("--no-legacy", action="store_true",
+                        help="only time the current tokenizer")
+    parser.add_argument("--revision",
+                        help="the git revision of the old tokenizer "
+                             "(default: the line-splitting one)")
+    args = parser.parse_args()
+
+    if not args.no_legacy:
+        LegacyJackTokenizer = import_revision(
+            args.revision or revision_before(MASTER_REGEX_LEXER),
+            ["JackTokenizer"])["JackTokenizer"].JackTokenizer
+
+    print(f"{'lines':>8} {'comments':>9} {'queue us/line':>14}"
+          f"{'' if args.no_legacy else ' legacy us/line':>16}")
+    for density in args.densities:
+        for lines in args.lines:
+            source = generate_lines(lines, density)
+            row = f"{lines:>8} {density:>9.0%} " \
+                  f"{time_tokenizer(JackTokenizer, source) / lines * 1e6:>14.2f}"
+            if not args.no_legacy:
+                legacy = time_tokenizer(LegacyJackTokenizer, source)
+                row += f" {legacy / lines * 1e6:>15.2f}"
+            print(row)
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,97 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Measures the latency of compiling one small class: a cold start of
+JackCompiler.py, CompileClient.py talking to a running CompileServer, and a
+raw request on the server's socket, without starting any process.
+
+Usage: python bench/bench_server.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from CompileClient import SOCKET_VARIABLE, request
+
+SOURCE = """
+class Main {
+    function void main() {
+        var int i, sum;
+        while (i < 10) {
+            let sum = sum + (i * i);
+            let i = i + 1;
+        }
+        do Output.printInt(sum);
+        return;
+    }
+}
+"""
+
+
+def latencies(run: typing.Callable[[], None], runs: int) -> typing.List[float]:
+    """Returns the wall time of every run, in milliseconds."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def wait_for(path: str, timeout: float = 10) -> None:
+    """Waits until the server created its socket."""
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            sys.exit("the compile server did not start")
+        time.sleep(0.01)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="compile server benchmark")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = os.path.join(directory, "Main.jack")
+        with open(source_path, "w") as source_file:
+            source_file.write(SOURCE)
+        socket_path = os.path.join(directory, "server.sock")
+        server = subprocess.Popen([sys.executable,
+                                   os.path.join(ROOT, "CompileServer.py"),
+                                   "--socket", socket_path])
+        try:
+            wait_for(socket_path)
+            env = dict(os.environ, **{SOCKET_VARIABLE: socket_path})
+            runs = {
+                "cold start": lambda: subprocess.run(
+                    [sys.executable, os.path.join(ROOT, "JackCompiler.py"),
+                     source_path], check=True),
+                "client": lambda: subprocess.run(
+                    [sys.executable, "-S",
+                     os.path.join(ROOT, "CompileClient.py"), source_path],
+                    env=env, check=True),
+                "raw request": lambda: request(socket_path, [source_path]),
+            }
+            for label, run in runs.items():
+                times = latencies(run, args.runs)
+                print(f"{label:>12}: median {statistics.median(times):7.1f} ms"
+                      f", best {min(times):7.1f} ms")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,78 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Compares ways of tokenizing a large generated Jack file: reading it as a
+whole, reading it lazily in chunks, and scanning the bytes of a memory map.
+Reports wall time and peak traced memory.
+
+Usage: python bench/bench_streaming.py [--subroutines N] [--chunk-size C]
+"""
+import argparse
+import collections
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from JackLexer import CHUNK_SIZE, Token, tokenize, tokenize_path, \
+    tokenize_stream
+from jack_programs import generate_source
+
+
+def read_and_tokenize(path: str) -> typing.Iterator[Token]:
+    with open(path, "r") as input_file:
+        yield from tokenize(input_file.read())
+
+
+def stream_and_tokenize(path: str, chunk_size: int) -> typing.Iterator[Token]:
+    with open(path, "r") as input_file:
+        yield from tokenize_stream(input_file, chunk_size)
+
+
+def measure(path: str, lex: typing.Callable[[str], typing.Iterator[Token]],
+            repeat: int) -> typing.Tuple[float, int]:
+    """Returns the best wall time and the peak traced memory of lexing the
+    file at path."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        collections.deque(lex(path), 0)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    collections.deque(lex(path), 0)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="streaming lexer benchmark")
+    parser.add_argument("--subroutines", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "Big.jack")
+        with open(path, "w") as output_file:
+            output_file.write(generate_source(args.subroutines))
+        print(f"{os.path.getsize(path):,} bytes of source")
+        for label, lex in (
+                ("whole file", read_and_tokenize),
+                ("streaming",
+                 lambda path: stream_and_tokenize(path, args.chunk_size)),
+                ("mmap bytes", tokenize_path)):
+            seconds, peak = measure(path, lex, args.repeat)
+            print(f"{label:>11}: {seconds * 1000:8.1f} ms, "
+                  f"peak {peak / 1024:10,.0f} KiB")
+
+
+if "__main__" == __name__:
+    main()
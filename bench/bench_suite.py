@@ -0,0 +1,162 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Times the compiler on every program shape of jack_programs, in three
+stages: JackTokenizer alone, CompilationEngine alone on already lexed
+tokens, and the whole compile_file. Reports tokens/s and lines/s for every
+stage, and the peak traced memory of compile_file.
+
+Results can be saved as a baseline, and later runs compared against it:
+--compare exits with status 1 if any stage got slower, or any peak grew, by
+more than the tolerance. Timings depend on the machine, so baselines should
+only be compared on the machine that saved them.
+
+Usage: python bench/bench_suite.py [--shapes S ...] [--scale F]
+                                    [--save FILE | --compare FILE]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from CompilationEngine import CompilationEngine
+from JackCompiler import compile_file
+from JackLexer import Token, tokenize
+from JackTokenizer import JackTokenizer
+from jack_programs import SHAPES, Program
+
+STAGES = ("tokenizer", "engine", "compile_file")
+
+# Results: for every shape, the best time of every stage in seconds and the
+# peak traced memory of compile_file in bytes.
+Results = typing.Dict[str, typing.Dict[str, float]]
+
+
+def drain(source: str) -> None:
+    tokenizer = JackTokenizer(io.StringIO(source))
+    while tokenizer.has_more_tokens():
+        tokenizer.advance()
+
+
+def stage_runs(program: Program) -> typing.Dict[str, typing.Callable[[], None]]:
+    """Returns a function running every stage over the whole program."""
+    sources = list(program.values())
+    lexed: typing.List[typing.List[Token]] = [list(tokenize(source))
+                                              for source in sources]
+    return {
+        "tokenizer": lambda: [drain(source) for source in sources],
+        "engine": lambda: [CompilationEngine(JackTokenizer.from_tokens(tokens),
+                                             io.StringIO())
+                           for tokens in lexed],
+        "compile_file": lambda: [compile_file(io.StringIO(source),
+                                              io.StringIO())
+                                 for source in sources],
+    }
+
+
+def best_time(run: typing.Callable[[], None], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(run: typing.Callable[[], None]) -> int:
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def measure(shapes: typing.List[str], scale: float, repeat: int) -> Results:
+    """Runs every stage on every shape and prints one line per stage."""
+    results: Results = {}
+    for shape in shapes:
+        generate, size = SHAPES[shape]
+        program = generate(max(1, round(size * scale)))
+        tokens = sum(1 for source in program.values()
+                     for _ in tokenize(source))
+        lines = sum(source.count("\n") for source in program.values())
+        print(f"{shape}: {len(program)} classes, {lines:,} lines, "
+              f"{tokens:,} tokens")
+        runs = stage_runs(program)
+        result = results[shape] = {}
+        for stage in STAGES:
+            seconds = result[stage] = best_time(runs[stage], repeat)
+            print(f"  {stage:>12}: {seconds * 1000:8.1f} ms "
+                  f"{tokens / seconds:12,.0f} tokens/s "
+                  f"{lines / seconds:10,.0f} lines/s")
+        peak = result["peak_bytes"] = peak_memory(runs["compile_file"])
+        print(f"  {'peak memory':>12}: {peak / 1024:8.1f} KiB")
+    return results
+
+
+def regressions(baseline: Results, results: Results,
+                tolerance: float) -> typing.List[str]:
+    """Compares results with a baseline.
+
+    Returns:
+        typing.List[str]: a line for every measurement of a shape in both
+        that grew by more than the tolerance, as a fraction.
+    """
+    lines = []
+    for shape, result in results.items():
+        for name, value in result.items():
+            old = baseline.get(shape, {}).get(name)
+            if old and value > old * (1 + tolerance):
+                lines.append(f"{shape} {name}: {old:.6g} -> {value:.6g} "
+                             f"({value / old - 1:+.0%})")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="compiler benchmark suite")
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES),
+                        default=list(SHAPES))
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplies the size of every program")
+    parser.add_argument("--repeat", type=int, default=5)
+    saving = parser.add_mutually_exclusive_group()
+    saving.add_argument("--save", metavar="FILE",
+                        help="save the results as a baseline")
+    saving.add_argument("--compare", metavar="FILE",
+                        help="compare the results with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="the growth --compare accepts (default 0.25)")
+    args = parser.parse_args()
+
+    results = measure(args.shapes, args.scale, args.repeat)
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump({"scale": args.scale, "results": results},
+                      baseline_file, indent=2)
+            baseline_file.write("\n")
+        print(f"baseline saved to {args.save}")
+    elif args.compare:
+        with open(args.compare, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["scale"] != args.scale:
+            sys.exit(f"the baseline was measured with --scale "
+                     f"{baseline['scale']}")
+        found = regressions(baseline["results"], results, args.tolerance)
+        for line in found:
+            print(f"regression: {line}")
+        if found:
+            sys.exit(1)
+        print(f"no regressions against {args.compare}")
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,170 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Compares SymbolTable with the dict-per-symbol table it replaced, as it was
+at an earlier git revision. The symbol table calls of compiling a generated,
+symbol-heavy class are recorded once, and then replayed against both tables:
+every variable reference costs a kind_of and an index_of call on the old
+table, which is what CompilationEngine used to do, and a single resolve call
+on the new one. Reports time, scope lookups, and how many symbol records are
+allocated. The runs of the two tables alternate, so that both see the same
+machine load.
+
+Usage: python bench/bench_symbols.py [--subroutines N] [--locals V]
+                                     [--revision REV]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import CompilationEngine
+from JackTokenizer import JackTokenizer
+from SymbolTable import Symbol, SymbolTable
+from git_revision import SYMBOL_RECORDS, import_revision, \
+    revision_before
+from jack_programs import symbol_heavy
+
+Call = typing.Tuple[str, typing.Tuple[typing.Any, ...]]
+
+
+class RecordingSymbolTable(SymbolTable):
+    """Records the calls CompilationEngine makes."""
+    calls: typing.List[Call] = []
+
+    def start_subroutine(self) -> None:
+        self.calls.append(("start_subroutine", ()))
+        super().start_subroutine()
+
+    def define(self, name: str, type: str, kind: str) -> None:
+        self.calls.append(("define", (name, type, kind)))
+        super().define(name, type, kind)
+
+    def resolve(self, name: str):
+        self.calls.append(("resolve", (name,)))
+        return super().resolve(name)
+
+
+def record_calls(source: str) -> typing.List[Call]:
+    """Compiles source and returns the symbol table calls it made."""
+    CompilationEngine.SymbolTable = RecordingSymbolTable
+    try:
+        CompilationEngine.CompilationEngine(
+            JackTokenizer(io.StringIO(source)), io.StringIO())
+    finally:
+        CompilationEngine.SymbolTable = SymbolTable
+    return RecordingSymbolTable.calls
+
+
+def replay_legacy(table: typing.Any, calls: typing.List[Call]) -> None:
+    for method, args in calls:
+        if method == "resolve":
+            table.kind_of(*args)
+            table.index_of(*args)
+        elif method == "define":
+            table.define(*args)
+        else:
+            table.start_subroutine()
+
+
+def replay(table: SymbolTable, calls: typing.List[Call]) -> None:
+    for method, args in calls:
+        if method == "resolve":
+            table.resolve(*args)
+        elif method == "define":
+            table.define(*args)
+        else:
+            table.start_subroutine()
+
+
+class CountingDict(dict):
+    """A scope that counts its lookups."""
+    lookups = 0
+
+    def __contains__(self, key: typing.Any) -> bool:
+        CountingDict.lookups += 1
+        return super().__contains__(key)
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        CountingDict.lookups += 1
+        return super().__getitem__(key)
+
+    def get(self, key: typing.Any, default: typing.Any = None) -> typing.Any:
+        CountingDict.lookups += 1
+        return super().get(key, default)
+
+
+def counting_table(table_class: typing.Type) -> typing.Any:
+    """Returns an empty table of table_class whose scopes count lookups,
+    including the scopes that start_subroutine creates."""
+    class CountingTable(table_class):
+        def start_subroutine(self) -> None:
+            super().start_subroutine()
+            if type(self.subroutine_scope) is not CountingDict:
+                self.subroutine_scope = CountingDict(self.subroutine_scope)
+
+    table = CountingTable()
+    table.class_scope = CountingDict()
+    table.subroutine_scope = CountingDict()
+    return table
+
+
+def best_times(runs: typing.List[typing.Callable[[], None]],
+               repeat: int) -> typing.List[float]:
+    """Returns the best wall time of every run, alternating between them."""
+    best = [float("inf")] * len(runs)
+    for _ in range(repeat):
+        for position, run in enumerate(runs):
+            start = time.perf_counter()
+            run()
+            best[position] = min(best[position], time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="symbol table benchmark")
+    parser.add_argument("--subroutines", type=int, default=200)
+    parser.add_argument("--locals", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--revision",
+                        help="the git revision of the table to compare "
+                             "against (default: the dict-per-symbol one)")
+    args = parser.parse_args()
+
+    calls = record_calls(
+        symbol_heavy(args.subroutines, args.locals)["Symbols"])
+    defines = sum(method == "define" for method, _ in calls)
+    references = sum(method == "resolve" for method, _ in calls)
+    print(f"{defines:,} definitions, {references:,} variable references")
+
+    LegacySymbolTable = import_revision(
+        args.revision or revision_before(SYMBOL_RECORDS),
+        ["SymbolTable"])["SymbolTable"].SymbolTable
+    legacy = counting_table(LegacySymbolTable)
+    table = counting_table(SymbolTable)
+    lookups = []
+    for replay_calls, counted in ((replay_legacy, legacy), (replay, table)):
+        CountingDict.lookups = 0
+        replay_calls(counted, calls)
+        lookups.append(CountingDict.lookups)
+    records = [(defines, sys.getsizeof({"type": "int", "kind": "VAR",
+                                        "index": 0})),
+               (len(table.class_scope) + len(table._records),
+                sys.getsizeof(Symbol("int", "VAR", "local", 0)))]
+    seconds = best_times([lambda: replay_legacy(LegacySymbolTable(), calls),
+                          lambda: replay(SymbolTable(), calls)], args.repeat)
+    for position, label in enumerate(("dict per symbol", "reused records")):
+        count, size = records[position]
+        print(f"{label:>16}: {seconds[position] * 1000:7.1f} ms, "
+              f"{lookups[position] / references:4.2f} lookups per reference, "
+              f"{count:6,} records of {size} bytes allocated")
+
+if "__main__" == __name__:
+    main()
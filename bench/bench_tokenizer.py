@@ -0,0 +1,77 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Compares the master-regex lexer behind JackTokenizer with the old
+line-splitting tokenizer, as it was at an earlier git revision, on a large
+generated Jack class.
+
+Usage: python bench/bench_tokenizer.py [--subroutines N] [--repeat R]
+                                       [--revision REV]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from JackTokenizer import JackTokenizer
+from git_revision import MASTER_REGEX_LEXER, import_revision, \
+    revision_before
+from jack_programs import generate_source
+
+
+def drain(tokenizer_class: type, source: str) -> typing.List[typing.Tuple]:
+    """Tokenizes the whole source and returns its (type, value) pairs."""
+    tokenizer = tokenizer_class(io.StringIO(source))
+    tokens = []
+    while tokenizer.has_more_tokens() and tokenizer.advance():
+        kind = tokenizer.token_type()
+        value = tokenizer.string_val() if kind == "STRING_CONST" \
+            else tokenizer.identifier()
+        tokens.append((kind, value))
+    return tokens
+
+
+def best_time(tokenizer_class: type, source: str, repeat: int) -> float:
+    """Returns the best wall time of draining the source, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        drain(tokenizer_class, source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JackTokenizer benchmark")
+    parser.add_argument("--subroutines", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--revision",
+                        help="the git revision of the tokenizer to compare "
+                             "against (default: the line-splitting one)")
+    args = parser.parse_args()
+
+    LegacyJackTokenizer = import_revision(
+        args.revision or revision_before(MASTER_REGEX_LEXER),
+        ["JackTokenizer"])["JackTokenizer"].JackTokenizer
+    source = generate_source(args.subroutines)
+    tokens = drain(JackTokenizer, source)
+    if tokens != drain(LegacyJackTokenizer, source):
+        sys.exit("token streams differ between the two tokenizers")
+    print(f"{len(source.splitlines())} lines, {len(tokens)} tokens")
+    legacy = best_time(LegacyJackTokenizer, source, args.repeat)
+    regex = best_time(JackTokenizer, source, args.repeat)
+    for name, seconds in (("line-splitting", legacy), ("master regex", regex)):
+        print(f"{name:>15}: {seconds * 1000:9.1f} ms "
+              f"{len(tokens) / seconds:12,.0f} tokens/s")
+    print(f"{'speedup':>15}: {legacy / regex:9.1f}x")
+
+
+if "__main__" == __name__:
+    main()
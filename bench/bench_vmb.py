@@ -0,0 +1,94 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Compares loading compiled classes from .vm text, which has to be read,
+tokenized and parsed, with loading them from .vmb files through mmap. Both
+loaders build the same VMCode, which is checked. The classes of every
+generated program shape are compiled once and written both ways to a
+temporary directory; the loads of the two formats alternate, so that both
+see the same machine load.
+
+Usage: python bench/bench_vmb.py [--shapes S ...] [--repeat R]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from JackCompiler import compile_code
+from VMBinary import load_binary, write_binary
+from VMCode import VMCode, parse, serialize
+from jack_programs import SHAPES
+
+
+def load_text(path: str) -> VMCode:
+    with open(path, 'r') as vm_file:
+        return parse(vm_file.read())
+
+
+LOADERS: typing.Tuple[typing.Tuple[str, str, typing.Callable[[str], VMCode]],
+                      ...] = ((".vm text", ".vm", load_text),
+                              (".vmb mmap", ".vmb", load_binary))
+
+
+def best_times(paths: typing.List[typing.List[str]],
+               repeat: int) -> typing.List[float]:
+    """Returns the best wall time of loading all the files of every format,
+    alternating between the formats."""
+    best = [float("inf")] * len(LOADERS)
+    for _ in range(repeat):
+        for position, (_, _, load) in enumerate(LOADERS):
+            start = time.perf_counter()
+            for path in paths[position]:
+                load(path)
+            best[position] = min(best[position], time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=".vm and .vmb load "
+                                                 "benchmark")
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES),
+                        default=list(SHAPES))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for shape in args.shapes:
+            generate, size = SHAPES[shape]
+            paths: typing.List[typing.List[str]] = [[] for _ in LOADERS]
+            instructions = 0
+            for name, source in generate(size).items():
+                code = compile_code(source)
+                instructions += len(code)
+                base = os.path.join(directory, f"{shape}.{name}")
+                with open(base + ".vm", 'w') as vm_file:
+                    vm_file.write(serialize(code))
+                write_binary(code, base + ".vmb")
+                for position, (_, extension, _) in enumerate(LOADERS):
+                    paths[position].append(base + extension)
+            for text_path, binary_path in zip(*paths):
+                if serialize(load_text(text_path)) != \
+                        serialize(load_binary(binary_path)):
+                    sys.exit(f"{binary_path} does not load as {text_path}")
+            print(f"{shape}: {len(paths[0])} classes, {instructions:,} "
+                  f"instructions")
+            seconds = best_times(paths, args.repeat)
+            for position, (label, _, _) in enumerate(LOADERS):
+                size_bytes = sum(os.path.getsize(path)
+                                 for path in paths[position])
+                print(f"  {label:>10}: {seconds[position] * 1000:8.2f} ms "
+                      f"{instructions / seconds[position]:14,.0f} "
+                      f"instructions/s {size_bytes / 1024:8.1f} KiB")
+            print(f"  {'speedup':>10}: {seconds[0] / seconds[1]:8.1f}x")
+
+
+if "__main__" == __name__:
+    main()
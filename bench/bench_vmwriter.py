@@ -0,0 +1,68 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Measures VMWriter throughput on the command stream of string literals (two
+commands per character), writing to a real file with different buffer sizes.
+
+Usage: python bench/bench_vmwriter.py [--literals N] [--length L]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from VMWriter import VMWriter
+
+
+def write_literals(writer: VMWriter, literals: typing.List[str]) -> None:
+    """Emits string literals the way CompilationEngine does."""
+    for literal in literals:
+        writer.write_push("constant", len(literal))
+        writer.write_call("String.new", 1)
+        for char in literal:
+            writer.write_push("constant", ord(char))
+            writer.write_call("String.appendChar", 2)
+    writer.flush()
+
+
+def best_time(literals: typing.List[str], buffer_size: typing.Optional[int],
+              repeat: int) -> float:
+    """Returns the best wall time of writing all literals to a file."""
+    best = float("inf")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "Bench.vm")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with open(path, "w") as output_file:
+                write_literals(VMWriter(output_file, buffer_size), literals)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VMWriter benchmark")
+    parser.add_argument("--literals", type=int, default=2000)
+    parser.add_argument("--length", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    literals = [f"literal {i} ".ljust(args.length, "x")
+                for i in range(args.literals)]
+    commands = sum(2 + 2 * len(literal) for literal in literals)
+    print(f"{commands} VM commands")
+    for label, buffer_size in (("unbuffered", 0), ("every 1024", 1024),
+                               ("once per class", None)):
+        seconds = best_time(literals, buffer_size, args.repeat)
+        print(f"{label:>15}: {seconds * 1000:8.1f} ms "
+              f"{commands / seconds:12,.0f} commands/s")
+
+
+if "__main__" == __name__:
+    main()
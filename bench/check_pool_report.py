@@ -0,0 +1,80 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Checks the literal counts of JackCompiler --pool-report on small classes
+whose counts are known, with and without branches and loops, whose labels
+the pooled code also has. Exits with status 1 if any count is wrong.
+
+Usage: python bench/check_pool_report.py
+"""
+import os
+import sys
+import tempfile
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from JackCompiler import CompileOptions, string_pool_report
+
+# Classes, by name, with their literal uses and distinct literals.
+CASES: typing.Dict[str, typing.Tuple[str, int, int]] = {
+    "OneUse": ("""class OneUse {
+    function void main() {
+        do Output.printString("hi");
+        return;
+    }
+}
+""", 1, 1),
+    "OneLiteral": ("""class OneLiteral {
+    function void main() {
+        var int i;
+        while (i < 3) {
+            if (i = 1) {
+                do Output.printString("hi");
+            } else {
+                do Output.printString("hi");
+            }
+            let i = i + 1;
+        }
+        return;
+    }
+}
+""", 2, 1),
+    "TwoLiterals": ("""class TwoLiterals {
+    function void main() {
+        if (true) {
+            do Output.printString("a");
+        }
+        do Output.printString("b");
+        do Output.printString("a");
+        return;
+    }
+}
+""", 3, 2),
+}
+
+
+def main() -> None:
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (source, uses, distinct) in CASES.items():
+            path = os.path.join(directory, f"{name}.jack")
+            with open(path, 'w') as source_file:
+                source_file.write(source)
+            for options in (CompileOptions(), CompileOptions(optimize=True)):
+                report = string_pool_report(path, options)
+                ok = report.startswith(
+                    f"{name}.jack: {uses} string literal uses, {distinct} "
+                    f"distinct;") and \
+                    report.endswith(f"at most {distinct} per run")
+                failed = failed or not ok
+                print(("ok      " if ok else "WRONG   ") + report)
+    if failed:
+        sys.exit(1)
+
+
+if "__main__" == __name__:
+    main()
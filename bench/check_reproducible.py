@@ -0,0 +1,165 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Checks that compiling a class always gives the same bytes, no matter what
+else is compiled with it, in which order, or where. The classes are
+compiled one by one for reference, and then:
+- in several shuffled orders, all in this process;
+- on a pool of threads, through the in-memory API;
+- on a pool of worker processes, as JackCompiler --jobs does;
+- twice through a build cache, so that the second build is restored from it;
+- as a whole program, with the classes given in shuffled orders.
+Every check runs with several code generation settings. Exits with status 1
+if any output differs.
+
+Usage: python bench/check_reproducible.py [DIR] [--orders N] [--jobs J]
+                                          [--seed S]
+"""
+import argparse
+import concurrent.futures
+import os
+import random
+import sys
+import tempfile
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from JackCompiler import CompileOptions, compile_many, compile_paths, \
+    compile_source, jack_files
+from VMInliner import INLINE_BUDGET
+from jack_programs import Program, comment_heavy, deep_expressions, \
+    long_chains, long_strings, many_classes, mixed, symbol_heavy, \
+    wide_expressions
+
+OPTION_SETS = {
+    "default": CompileOptions(),
+    "-O": CompileOptions(optimize=True),
+    "--pool-strings": CompileOptions(pool_strings=True),
+    "--precedence": CompileOptions(precedence=True),
+    "-O --inline": CompileOptions(optimize=True, inline=INLINE_BUDGET),
+}
+
+# The compiled code of every class, by class name.
+Outputs = typing.Dict[str, str]
+
+
+def generated_program() -> Program:
+    """A program mixing every generated shape, with branches and loops in
+    many subroutines of many classes."""
+    program: Program = {}
+    for shape in (many_classes(20), mixed(20), long_chains(5),
+                  symbol_heavy(5), deep_expressions(10),
+                  wide_expressions(10), long_strings(20), comment_heavy(20)):
+        program.update(shape)
+    return program
+
+
+def read_program(directory: str) -> Program:
+    program = {}
+    for path in jack_files(directory):
+        with open(path, 'r') as source_file:
+            program[os.path.splitext(os.path.basename(path))[0]] = \
+                source_file.read()
+    return program
+
+
+def compile_in_order(program: Program, names: typing.List[str],
+                     options: CompileOptions) -> Outputs:
+    return {name: compile_source(program[name], options) for name in names}
+
+
+def compile_on_threads(program: Program, options: CompileOptions,
+                       jobs: int) -> Outputs:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {name: executor.submit(compile_source, source, options)
+                   for name, source in program.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def compile_on_disk(program: Program, options: CompileOptions, jobs: int,
+                    cache_dir: typing.Optional[str] = None) -> Outputs:
+    """Writes the program to a temporary directory and compiles it with
+    compile_paths, as JackCompiler does."""
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for name, source in program.items():
+            paths.append(os.path.join(directory, f"{name}.jack"))
+            with open(paths[-1], 'w') as source_file:
+                source_file.write(source)
+        errors = compile_paths(paths, jobs, cache_dir, options)
+        if errors:
+            sys.exit(f"compilation failed: {errors}")
+        outputs = {}
+        for name, path in zip(program, paths):
+            with open(os.path.splitext(path)[0] + ".vm", 'r') as output_file:
+                outputs[name] = output_file.read()
+        return outputs
+
+
+def compile_cached(program: Program, options: CompileOptions) -> Outputs:
+    """Compiles the program twice with the same build cache, and returns
+    the output of the second build, which the cache restores."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compile_on_disk(program, options, 1, cache_dir)
+        return compile_on_disk(program, options, 1, cache_dir)
+
+
+def differences(reference: Outputs, outputs: Outputs) -> typing.List[str]:
+    """Returns the names of the classes whose outputs differ."""
+    return sorted(name for name in reference
+                  if outputs.get(name) != reference[name])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="reproducible output check")
+    parser.add_argument("directory", nargs="?",
+                        help="the .jack files to check, instead of a "
+                             "generated program")
+    parser.add_argument("--orders", type=int, default=3,
+                        help="the number of shuffled orders")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    program = read_program(args.directory) if args.directory \
+        else generated_program()
+    shuffler = random.Random(args.seed)
+    print(f"{len(program)} classes")
+    failed = False
+    for label, options in OPTION_SETS.items():
+        reference = compile_in_order(program, sorted(program), options)
+        checks: typing.List[typing.Tuple[str, Outputs, Outputs]] = []
+        for order in range(args.orders):
+            names = sorted(program)
+            shuffler.shuffle(names)
+            checks.append((f"shuffled order {order + 1}", reference,
+                           compile_in_order(program, names, options)))
+        checks.append((f"{args.jobs} threads", reference,
+                       compile_on_threads(program, options, args.jobs)))
+        checks.append((f"{args.jobs} processes", reference,
+                       compile_on_disk(program, options, args.jobs)))
+        checks.append(("build cache", reference,
+                       compile_cached(program, options)))
+        whole_program = compile_many(program, options, whole_program=True)
+        for order in range(args.orders):
+            names = sorted(program)
+            shuffler.shuffle(names)
+            checks.append((f"whole program, order {order + 1}", whole_program,
+                           compile_many({name: program[name] for name in names},
+                                        options, whole_program=True)))
+        print(f"{label}:")
+        for check, expected, outputs in checks:
+            differing = differences(expected, outputs)
+            failed = failed or bool(differing)
+            print(f"  {check:>26}: " + ("identical" if not differing else
+                                        "differs in " + ", ".join(differing)))
+    if failed:
+        sys.exit(1)
+
+
+if "__main__" == __name__:
+    main()
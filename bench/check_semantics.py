@@ -0,0 +1,328 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Checks that the passes rewriting emitted code keep its meaning. Every sample
+program under bench/programs is compiled with each setting of OPTION_SETS
+and run on a small VM emulator. The OS functions the programs call are
+replaced by Python stand-ins that record what the program prints and draws.
+Every run must record exactly what the default build records, and the
+default build must record what bench/programs/expected.json pins. Reports
+the VM commands executed by every run, and exits with status 1 on any
+difference.
+
+Usage: python bench/check_semantics.py [--update]
+"""
+import argparse
+import json
+import os
+import sys
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from JackCompiler import CompileOptions, compile_many_code
+from VMInliner import INLINE_BUDGET
+from VMCode import ADD, AND, ARGUMENT, CALL, CONSTANT, EQ, FUNCTION, GOTO, \
+    GT, IF_GOTO, LABEL, LOCAL, LT, NEG, NOT, OR, POINTER, POP, PUSH, RETURN, \
+    SHIFTLEFT, SHIFTRIGHT, STATIC, SUB, TEMP, THAT, THIS, VMCode
+
+PROGRAMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "programs")
+EXPECTED_PATH = os.path.join(PROGRAMS_DIR, "expected.json")
+
+# The settings every program is compiled with, by the command line flags
+# they stand for, and whether unreachable subroutines are removed.
+OPTION_SETS: typing.Dict[str, typing.Tuple[CompileOptions, bool]] = {
+    "default": (CompileOptions(), False),
+    "-O": (CompileOptions(optimize=True), False),
+    "--pool-strings": (CompileOptions(pool_strings=True), False),
+    "-O --gc-functions": (CompileOptions(optimize=True), True),
+    "--inline": (CompileOptions(inline=INLINE_BUDGET), False),
+    "-O --inline": (CompileOptions(optimize=True, inline=INLINE_BUDGET),
+                    False),
+}
+
+# What the printing and drawing stand-ins record.
+Output = typing.List[typing.Any]
+
+
+class Setup(typing.NamedTuple):
+    """What a program reads while it runs."""
+    # The numbers Keyboard.readInt returns, in order.
+    inputs: typing.Tuple[int, ...] = ()
+    # The keys Keyboard.keyPressed returns, in order, then always q.
+    keys: typing.Tuple[int, ...] = ()
+    # RAM words set before the run, by address.
+    ram: typing.Dict[int, int] = {}
+    # RAM words recorded after the run, from the first address up to the
+    # second.
+    dump: typing.Tuple[int, int] = (0, 0)
+
+
+SETUPS = {
+    "Average": Setup(inputs=(3, 10, 20, 31)),
+    "ConvertToBin": Setup(ram={8000: 0x5A5A}, dump=(8001, 8017)),
+    "Square": Setup(keys=(0, 90, 90, 0, 131, 0, 88, 0, 81, 0)),
+}
+
+_WORD = 0xFFFF
+_STEP_LIMIT = 10 ** 7
+_SP, _LCL, _ARG, _THIS, _THAT = range(5)
+_BINARY = {ADD: lambda a, b: a + b, SUB: lambda a, b: a - b,
+           AND: lambda a, b: a & b, OR: lambda a, b: a | b,
+           EQ: lambda a, b: -1 if a == b else 0,
+           GT: lambda a, b: -1 if _signed(a) > _signed(b) else 0,
+           LT: lambda a, b: -1 if _signed(a) < _signed(b) else 0}
+_UNARY = {NEG: lambda a: -a, NOT: lambda a: ~a, SHIFTLEFT: lambda a: a << 1,
+          SHIFTRIGHT: lambda a: _signed(a) >> 1}
+# The fixed base address of a segment, or the address of its base pointer.
+_SEGMENT_BASES = {POINTER: 3, TEMP: 5}
+_SEGMENT_POINTERS = {ARGUMENT: _ARG, LOCAL: _LCL, THIS: _THIS, THAT: _THAT}
+
+
+def _signed(value: int) -> int:
+    value &= _WORD
+    return value - 0x10000 if value & 0x8000 else value
+
+
+class Emulator:
+    """Runs the VM code of a program from Main.main, with stand-ins for the
+    OS functions it calls.
+    """
+
+    def __init__(self, codes: typing.Iterable[typing.Tuple[str, VMCode]],
+                 setup: Setup) -> None:
+        """
+        Args:
+            codes (typing.Iterable[typing.Tuple[str, VMCode]]): the code of
+            every class, with the class name.
+            setup (Setup): what the program reads.
+        """
+        # Instructions as (opcode, arg1, arg2, class name), with label and
+        # function names in arg1.
+        self.program: typing.List[typing.Tuple[int, typing.Any, int, str]] = []
+        self.functions: typing.Dict[str, typing.Tuple[int, int]] = {}
+        self.labels: typing.Dict[typing.Tuple[str, str], int] = {}
+        for class_name, code in codes:
+            function = ""
+            for opcode, arg1, arg2 in code:
+                if opcode in (LABEL, GOTO, IF_GOTO, CALL, FUNCTION):
+                    arg1 = code.names[arg1]
+                if opcode == FUNCTION:
+                    function = arg1
+                    self.functions[arg1] = (len(self.program), arg2)
+                elif opcode in (LABEL, GOTO, IF_GOTO):
+                    arg1 = (function, arg1)
+                    if opcode == LABEL:
+                        self.labels[arg1] = len(self.program)
+                self.program.append((opcode, arg1, arg2, class_name))
+        self.ram = [0] * 32768
+        for address, value in setup.ram.items():
+            self.ram[address] = value
+        self.setup = setup
+        self.inputs = list(setup.inputs)
+        self.keys = list(setup.keys)
+        self.output: Output = []
+        self.steps = 0
+        self._heap = 2048
+        self._strings: typing.Dict[int, typing.List[str]] = {}
+        self._statics: typing.Dict[typing.Tuple[str, int], int] = {}
+
+    def run(self) -> Output:
+        """
+        Returns:
+            Output: what the program printed and drew, followed by the RAM
+            words of setup.dump, if any.
+
+        Raises:
+            RuntimeError: if the program runs for too long.
+        """
+        ram = self.ram
+        ram[_SP] = 256
+        pc = self._call("Main.main", 0, -1)
+        while pc >= 0:
+            self.steps += 1
+            if self.steps > _STEP_LIMIT:
+                raise RuntimeError("step limit reached")
+            opcode, arg1, arg2, class_name = self.program[pc]
+            pc += 1
+            if opcode == PUSH:
+                self._push(arg2 if arg1 == CONSTANT
+                           else ram[self._address(arg1, arg2, class_name)])
+            elif opcode == POP:
+                value = self._pop()
+                ram[self._address(arg1, arg2, class_name)] = value
+            elif opcode in _BINARY:
+                right = self._pop()
+                self._push(_BINARY[opcode](self._pop(), right))
+            elif opcode in _UNARY:
+                self._push(_UNARY[opcode](self._pop()))
+            elif opcode == GOTO:
+                pc = self.labels[arg1]
+            elif opcode == IF_GOTO:
+                if self._pop():
+                    pc = self.labels[arg1]
+            elif opcode == CALL:
+                pc = self._call(arg1, arg2, pc)
+            elif opcode == RETURN:
+                pc = self._return()
+        start, end = self.setup.dump
+        return self.output + ram[start:end]
+
+    def _push(self, value: int) -> None:
+        self.ram[self.ram[_SP]] = value & _WORD
+        self.ram[_SP] += 1
+
+    def _pop(self) -> int:
+        self.ram[_SP] -= 1
+        return self.ram[self.ram[_SP]]
+
+    def _address(self, segment: int, index: int, class_name: str) -> int:
+        if segment == STATIC:
+            return self._statics.setdefault((class_name, index),
+                                            16 + len(self._statics))
+        if segment in _SEGMENT_BASES:
+            return _SEGMENT_BASES[segment] + index
+        return self.ram[_SEGMENT_POINTERS[segment]] + index
+
+    def _call(self, name: str, arg_count: int, return_pc: int) -> int:
+        ram = self.ram
+        if name not in self.functions:
+            arguments = ram[ram[_SP] - arg_count:ram[_SP]]
+            ram[_SP] -= arg_count
+            self._push(self._os_call(name, arguments))
+            return return_pc
+        self._push(return_pc & _WORD)
+        for pointer in (_LCL, _ARG, _THIS, _THAT):
+            self._push(ram[pointer])
+        ram[_ARG] = ram[_SP] - 5 - arg_count
+        ram[_LCL] = ram[_SP]
+        start, local_count = self.functions[name]
+        for _ in range(local_count):
+            self._push(0)
+        return start + 1
+
+    def _return(self) -> int:
+        ram = self.ram
+        frame = ram[_LCL]
+        return_pc = ram[frame - 5]
+        ram[ram[_ARG]] = self._pop()
+        ram[_SP] = ram[_ARG] + 1
+        ram[_THAT], ram[_THIS], ram[_ARG], ram[_LCL] = \
+            ram[frame - 1], ram[frame - 2], ram[frame - 3], ram[frame - 4]
+        return -1 if return_pc == _WORD else return_pc
+
+    def _os_call(self, name: str, arguments: typing.List[int]) -> int:
+        values = [_signed(argument) for argument in arguments]
+        if name == "Math.multiply":
+            return values[0] * values[1]
+        if name == "Math.divide":
+            quotient = abs(values[0]) // abs(values[1])
+            return quotient if (values[0] < 0) == (values[1] < 0) \
+                else -quotient
+        if name in ("Memory.alloc", "Array.new", "String.new"):
+            address = self._heap
+            self._heap += max(values[0], 1)
+            if name == "String.new":
+                self._strings[address] = []
+            return address
+        if name in ("Memory.deAlloc", "Array.dispose"):
+            return 0
+        if name == "Memory.peek":
+            return self.ram[values[0]]
+        if name == "Memory.poke":
+            self.ram[values[0]] = arguments[1]
+            return 0
+        if name == "String.appendChar":
+            self._strings[arguments[0]].append(chr(values[1]))
+            return arguments[0]
+        if name == "Output.printString":
+            self.output.append("".join(self._strings[arguments[0]]))
+        elif name == "Output.printInt":
+            self.output.append(values[0])
+        elif name == "Output.println":
+            self.output.append("\n")
+        elif name == "Keyboard.readInt":
+            return self.inputs.pop(0)
+        elif name == "Keyboard.keyPressed":
+            return self.keys.pop(0) if self.keys else ord("Q")
+        elif name.startswith("Screen.") or name == "Sys.wait":
+            self.output.append([name] + values)
+        else:
+            raise KeyError(f"no stand-in for {name}")
+        return 0
+
+
+def read_program(name: str) -> typing.Dict[str, str]:
+    """Returns the source of every class of a sample program."""
+    directory = os.path.join(PROGRAMS_DIR, name)
+    program = {}
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(".jack"):
+            with open(os.path.join(directory, file_name), 'r') as source_file:
+                program[file_name[:-len(".jack")]] = source_file.read()
+    return program
+
+
+def run_program(program: typing.Dict[str, str], setup: Setup,
+                options: CompileOptions, gc_functions: bool
+                ) -> typing.Tuple[Output, int]:
+    """Compiles and runs a program.
+
+    Returns:
+        typing.Tuple[Output, int]: what it recorded, and the number of VM
+        commands it executed.
+    """
+    codes = compile_many_code(program, options, whole_program=True,
+                              gc_functions=gc_functions)
+    emulator = Emulator(codes.items(), setup)
+    return emulator.run(), emulator.steps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="check that compiler "
+                                                 "settings keep semantics")
+    parser.add_argument("--update", action="store_true",
+                        help="pin what the default builds record as the "
+                             "expected results")
+    args = parser.parse_args()
+
+    names = sorted(name for name in os.listdir(PROGRAMS_DIR)
+                   if os.path.isdir(os.path.join(PROGRAMS_DIR, name)))
+    expected: typing.Dict[str, Output] = {}
+    if not args.update:
+        with open(EXPECTED_PATH, 'r') as expected_file:
+            expected = json.load(expected_file)
+    recorded: typing.Dict[str, Output] = {}
+    failed = False
+    print(f"{'':14}" + "".join(f"{label:>19}" for label in OPTION_SETS))
+    for name in names:
+        program = read_program(name)
+        setup = SETUPS.get(name, Setup())
+        columns = []
+        for label, (options, gc_functions) in OPTION_SETS.items():
+            output, steps = run_program(program, setup, options,
+                                        gc_functions)
+            if label == "default":
+                recorded[name] = output
+                same = args.update or output == expected.get(name)
+            else:
+                same = output == recorded[name]
+            failed = failed or not same
+            columns.append(f"{steps:>11,} steps" if same else
+                           f"{'differs':>17}")
+        print(f"{name:14}" + "".join(f"{column:>19}" for column in columns))
+    if args.update:
+        with open(EXPECTED_PATH, 'w') as expected_file:
+            json.dump(recorded, expected_file, indent=1)
+            expected_file.write("\n")
+        print(f"expected results written to {EXPECTED_PATH}")
+    if failed:
+        sys.exit(1)
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,99 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Imports the compiler modules of an earlier git revision next to the ones of
+the working tree, so that the benchmarks in this directory can compare the
+code as it is with the code it replaced.
+"""
+import importlib
+import io
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import types
+import typing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The changes the benchmarks measure, by the subject of the commit that made
+# them. By default, every benchmark compares against the revision right
+# before that commit, see revision_before.
+MASTER_REGEX_LEXER = "Tokenize with a single-pass master-regex lexer"
+SYMBOL_RECORDS = "Store symbols as reused __slots__ records"
+DISPATCH_TABLES = "Dispatch statements and operators through precomputed " \
+                  "tables"
+EXPLICIT_STACKS = "Parse expressions on explicit stacks"
+
+
+def _git(args: typing.List[str]) -> bytes:
+    """Runs git in the repository, and exits with its error if it fails."""
+    try:
+        return subprocess.run(["git"] + args, cwd=ROOT, capture_output=True,
+                              check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as error:
+        stderr = getattr(error, "stderr", b"") or b""
+        sys.exit(f"git {args[0]} failed: {stderr.decode().strip() or error}")
+
+
+def revision_before(subject: str) -> str:
+    """Finds a change by its commit subject, so that the benchmarks do not
+    depend on commit hashes, which rebasing changes.
+
+    Args:
+        subject (str): part of the subject of the commit, e.g. "Parse
+        expressions on explicit stacks".
+
+    Returns:
+        str: the revision right before the oldest commit whose subject
+        contains subject.
+    """
+    commits = [line.split(" ", 1)[0] for line in
+               _git(["log", "--format=%H %s"]).decode().splitlines()
+               if subject in line.split(" ", 1)[1]]
+    if not commits:
+        sys.exit(f'no commit with "{subject}" in its subject, pass the '
+                 f'revision to compare against with --revision')
+    return commits[-1] + "^"
+
+
+def import_revision(revision: str, names: typing.Iterable[str]
+                    ) -> typing.Dict[str, types.ModuleType]:
+    """Imports modules of the repository as they were at a revision. The
+    modules they import are taken from the same revision, and the modules of
+    the working tree that are already imported are left untouched.
+
+    Args:
+        revision (str): any git revision, e.g. "HEAD~3" or a commit hash.
+        names (typing.Iterable[str]): the names of the top-level modules to
+        import, e.g. "CompilationEngine".
+
+    Returns:
+        typing.Dict[str, types.ModuleType]: the imported modules, by name.
+    """
+    archive = _git(["archive", "--format=tar", revision])
+    with tempfile.TemporaryDirectory() as directory:
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            members = [member for member in tar.getmembers()
+                       if member.isfile() and "/" not in member.name
+                       and member.name.endswith(".py")]
+            tar.extractall(directory, members)
+        shadowed = [os.path.splitext(member.name)[0] for member in members]
+        saved = {name: sys.modules.pop(name) for name in shadowed
+                 if name in sys.modules}
+        sys.path.insert(0, directory)
+        sys.dont_write_bytecode, dont_write_bytecode = \
+            True, sys.dont_write_bytecode
+        try:
+            return {name: importlib.import_module(name) for name in names}
+        finally:
+            sys.dont_write_bytecode = dont_write_bytecode
+            sys.path.remove(directory)
+            for name in shadowed:
+                sys.modules.pop(name, None)
+            sys.modules.update(saved)
@@ -0,0 +1,196 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Generators of synthetic Jack programs of a controlled size and shape, shared
+by the benchmarks in this directory. Every generated program compiles.
+"""
+import typing
+
+# A Jack program: the source of every class, by class name.
+Program = typing.Dict[str, str]
+
+SUBROUTINE = """
+    /** Computes value number {i}. */
+    function int compute{i}(int a, int b) {{
+        var int x, y; // two locals
+        let x = a + (b * {i}) - 3;
+        /* inline */ let y = Math.max(x, "text {i}");
+        while (x > 0) {{
+            let x = x - 1;
+        }}
+        return x & y;
+    }}
+"""
+
+STATEMENTS = ("        let x = x + (y * 3) - z;",
+              "        do Output.printInt(x);",
+              "        let s = \"some text\";")
+
+
+def generate_source(subroutines: int) -> str:
+    """Generates one Jack class with the given number of subroutines."""
+    body = "".join(SUBROUTINE.format(i=i) for i in range(subroutines))
+    return f"// generated\nclass Big {{\n    field int a, b;\n{body}}}\n"
+
+
+def generate_lines(lines: int, comment_density: float) -> str:
+    """Generates a Jack class of roughly the given number of lines, of which
+    the given fraction are blank or comment lines.
+    """
+    body = []
+    comments = 0.0
+    for index in range(lines):
+        comments += comment_density
+        if comments >= 1:
+            comments -= 1
+            body.append("        // a comment line" if index % 2 else "")
+        else:
+            body.append(STATEMENTS[index % len(STATEMENTS)])
+    return ("class Scaled {\n    function void run() {\n"
+            "        var int x, y, z;\n        var String s;\n" +
+            "\n".join(body) + "\n        return;\n    }\n}\n")
+
+
+def _function(name: str, statements: typing.Iterable[str],
+              locals_declaration: str = "var int x, y, z;") -> str:
+    body = "".join(f"        {statement}\n" for statement in statements)
+    return (f"    function int {name}(int a, int b) {{\n"
+            f"        {locals_declaration}\n{body}        return x;\n    }}\n")
+
+
+def _class(name: str, subroutines: typing.Iterable[str]) -> str:
+    return f"class {name} {{\n{''.join(subroutines)}}}\n"
+
+
+def mixed(size: int) -> Program:
+    """Everyday code: declarations, arithmetic, calls, strings, loops and
+    comments, size subroutines long."""
+    return {"Big": generate_source(size)}
+
+
+def deep_expressions(size: int, depth: int = 40) -> Program:
+    """size statements whose expressions nest parentheses depth deep."""
+    operators = "+-*&|"
+    statements = []
+    for index in range(size):
+        expression = "a"
+        for level in range(depth):
+            expression = (f"({expression} {operators[level % 5]} "
+                          f"{'b' if level % 2 else level + index})")
+        statements.append(f"let x = {expression};")
+    return {"Deep": _class("Deep", [_function("run", statements)])}
+
+
+def wide_expressions(size: int, length: int = 30) -> Program:
+    """size statements whose expressions chain length operators without
+    nesting, over variables, constants and unary operators."""
+    operands = ("a", "b", "-x", "~y", "true", "null", "z", "17")
+    operators = "+-&|<>=*/"
+    statements = []
+    for index in range(size):
+        terms = [operands[(index + position) % len(operands)]
+                 for position in range(length + 1)]
+        expression = terms[0]
+        for position, term in enumerate(terms[1:]):
+            expression += (f" {operators[(index + position) % len(operators)]}"
+                           f" {term}")
+        statements.append(f"let x = {expression};")
+    return {"Wide": _class("Wide", [_function("run", statements)])}
+
+
+def long_strings(size: int, length: int = 200) -> Program:
+    """size string literals of the given length."""
+    statements = [f'do Output.printString("{index} ' +
+                  "lorem ipsum ".ljust(length, "x") + '");'
+                  for index in range(size)]
+    return {"Strings": _class("Strings", [_function("run", statements)])}
+
+
+def many_classes(size: int) -> Program:
+    """size small classes, each with a field, a constructor, a method and a
+    function that calls into the next class."""
+    program = {}
+    for index in range(size):
+        callee = f"Class{(index + 1) % size}"
+        program[f"Class{index}"] = f"""class Class{index} {{
+    field int value;
+    constructor Class{index} new(int start) {{
+        let value = start;
+        return this;
+    }}
+    method int get() {{
+        return value;
+    }}
+    function int step(int n) {{
+        if (n < 1) {{
+            return 0;
+        }}
+        return {callee}.step(n - 1) + {index};
+    }}
+}}
+"""
+    return program
+
+
+def comment_heavy(size: int) -> Program:
+    """size statements, each under a documentation comment and between
+    line and block comments, so that most bytes are comments."""
+    statements = []
+    for index in range(size):
+        statements.append(f"/** Step {index}: adds the arguments again, see "
+                          "the notes above for why this is done. */")
+        statements.append(f"let x = x + a; // running total {index}")
+        statements.append("/* " + "commentary " * 8 + "*/")
+    return {"Comments": _class("Comments", [_function("run", statements)])}
+
+
+def long_chains(size: int, length: int = 20) -> Program:
+    """size subroutines, each with an if/else chain and a run of while
+    loops of the given length."""
+    subroutines = []
+    for index in range(size):
+        statements = []
+        for link in range(length):
+            statements.append(f"if (a = {link}) {{ let x = {link}; }} else {{")
+        statements.append("let x = -1;" + " }" * length)
+        for link in range(length):
+            statements.append(f"while (y < {link}) {{ let y = y + 1; }}")
+        subroutines.append(_function(f"chain{index}", statements))
+    return {"Chains": _class("Chains", subroutines)}
+
+
+def symbol_heavy(size: int, locals_count: int = 30) -> Program:
+    """size methods whose statements mostly move values between arguments,
+    locals, fields and statics."""
+    lines = ["class Symbols {",
+             "    field int " + ", ".join(f"f{i}" for i in range(8)) + ";",
+             "    static int " + ", ".join(f"s{i}" for i in range(4)) + ";"]
+    local_names = [f"v{i}" for i in range(locals_count)]
+    for number in range(size):
+        lines.append(f"    method int m{number}(int a0, int a1, int a2) {{")
+        lines.append("        var int " + ", ".join(local_names) + ";")
+        for i, name in enumerate(local_names):
+            lines.append(f"        let {name} = a{i % 3} + f{i % 8} - "
+                         f"{local_names[i - 1]};")
+            lines.append(f"        let s{i % 4} = {name} + s{(i + 1) % 4};")
+        lines.append(f"        return {local_names[-1]};")
+        lines.append("    }")
+    lines.append("}")
+    return {"Symbols": "\n".join(lines) + "\n"}
+
+
+# Every shape, with a size that gives programs of comparable token counts.
+SHAPES: typing.Dict[str, typing.Tuple[typing.Callable[[int], Program], int]] = {
+    "mixed": (mixed, 400),
+    "deep_expressions": (deep_expressions, 100),
+    "wide_expressions": (wide_expressions, 400),
+    "long_strings": (long_strings, 4000),
+    "many_classes": (many_classes, 300),
+    "comment_heavy": (comment_heavy, 2000),
+    "long_chains": (long_chains, 60),
+    "symbol_heavy": (symbol_heavy, 80),
+}